@@ -0,0 +1,69 @@
+# FILE: benchmarks/import_time.py
+
+"""
+Measures cold-start cost of the project's entry points.
+Each module is imported in a fresh interpreter with `-X importtime`, so nothing is
+shared between measurements. Usage:
+
+    python benchmarks/import_time.py [--repeat 3] [--budget-ms 1500] [--top 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Modules that must stay cheap to import; heavy dependencies load on first use.
+MODULES = ["graph", "utils.llm_api", "utils.database", "utils.vector_store", "nodes.retriever"]
+# Imports that should never happen at import time.
+HEAVY_MODULES = ["torch", "sentence_transformers", "docker", "pymongo", "langchain_huggingface", "faiss"]
+
+def measure(module):
+    """Returns (wall time in ms, {top-level package: cumulative µs}) for one cold import."""
+    # Run from a scratch directory so nothing an import might write lands in the repo.
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    with tempfile.TemporaryDirectory(prefix="import-time-") as scratch:
+        env = {**os.environ, "PYTHONPATH": ROOT, "CHECKPOINT_DB_PATH": os.path.join(scratch, "checkpoints.sqlite")}
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=scratch, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not cumulative.isdigit():
+            continue
+        top = name.strip().split(".")[0]
+        packages[top] = max(packages.get(top, 0), int(cumulative))
+    return float(proc.stdout.strip().splitlines()[-1]), packages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if any median exceeds this.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list per module.")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeat)]
+        median = statistics.median(wall for wall, _ in runs)
+        packages = runs[-1][1]
+        heavy = [name for name in HEAVY_MODULES if name in packages]
+        print(f"⏱️ {module:<22} {median:8.1f} ms" + (f"  ⚠️ loads {', '.join(heavy)}" if heavy else ""))
+        for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"     {name:<28} {micros / 1000:8.1f} ms")
+        if args.budget_ms is not None and median > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"❌ Over the {args.budget_ms} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# FILE: benchmarks/pipeline_benchmark.py
+
+"""
+Offline end-to-end benchmark of the research graph.
+Runs the compiled graph from graph.get_app() with deterministic stand-ins, so no Hugging Face
+endpoint, Docker daemon, MongoDB or embedding model download is needed:
+
+- LLM: utils.llm_api's endpoint calls (plain and streaming) are replaced by scripted responses with configurable latency.
+- Sandbox: the local warm-interpreter backend runs the scripted experiment.
+- MongoDB: mongomock when installed; otherwise the knowledge-graph node is skipped.
+- Embeddings: a hashing bag-of-words embedder over synthetic corpora of the requested sizes.
+
+Usage:
+
+    python benchmarks/pipeline_benchmark.py --sizes 100 1000 10000 --runs 4 --workers 2 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+VOCABULARY = (
+    "transformer attention embedding gradient dataset benchmark accuracy recall precision "
+    "regularization dropout convolution graph retrieval augmentation latency throughput "
+    "sparsity quantization distillation pretraining finetuning tokenizer corpus encoder decoder "
+    "optimizer momentum batch normalization activation entropy calibration robustness"
+).split()
+
+DEFAULT_SCRIPT = {
+    "knowledge_graph": ['[{"source_entity": "transformer", "relation": "uses", "target_entity": "attention"},'
+                        ' {"source_entity": "attention", "relation": "improves", "target_entity": "accuracy"}]'],
+    "hypothesis": ["Sparse attention improves accuracy on long-document retrieval benchmarks."],
+    "experiment_plan": ['```json\n{"datasets": {"synthetic": "mock documents"},'
+                        ' "methodology": {"model": "sparse attention", "baseline": "dense attention"},'
+                        ' "metrics": {"primary": "accuracy"}}\n```'],
+    "code": ['```python\nimport json\nimport random\nrandom.seed(0)\n'
+             'results = {"accuracy_sparse": 0.81, "accuracy_dense": 0.78}\n'
+             'json.dump(results, open("results.json", "w"))\n```'],
+    "analysis": ["Sparse attention outperforms dense attention by three points of accuracy."],
+    "decision": ["proceed"],
+    "paper": ["# Sparse Attention\n\n## Abstract\nA synthetic paper.\n\n## Conclusion\nIt works."],
+    "default": ["OK"],
+}
+
+class FakeLLM:
+    """Deterministic stand-in for the endpoint: picks a scripted response by prompt type."""
+
+    def __init__(self, script, latency_ms=0.0, ms_per_1k_chars=0.0):
+        self.script = {**DEFAULT_SCRIPT, **script}
+        self.latency_s = latency_ms / 1000
+        self.per_char_s = ms_per_1k_chars / 1000 / 1000
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(prompt):
+        if "extract key entities" in prompt:
+            return "knowledge_graph"
+        if "testable scientific hypothesis" in prompt:
+            return "hypothesis"
+        if "lab director" in prompt:
+            return "experiment_plan"
+        if "expert Python programmer" in prompt:
+            return "code"
+        if "data analyst" in prompt:
+            return "analysis"
+        if "'proceed' or 'redesign'" in prompt:
+            return "decision"
+        if "research paper" in prompt:
+            return "paper"
+        return "default"
+
+    def respond(self, prompt):
+        kind = self.classify(prompt)
+        with self._lock:
+            count = self.calls.get(kind, 0)
+            self.calls[kind] = count + 1
+        responses = self.script[kind]
+        time.sleep(self.latency_s + self.per_char_s * len(prompt))
+        return responses[count % len(responses)]
+
+class HashingEmbeddings:
+    """Bag-of-words hashing embedder: deterministic, dependency-light and fast."""
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        import numpy as np
+        vector = np.zeros(self.dimensions, dtype="float32")
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.dimensions] += 1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+    def __call__(self, text):
+        return self._embed(text)
+
+def synthetic_chunks(count, seed=0):
+    """Yields (text, metadata, id) chunks of roughly splitter-sized synthetic text."""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = [rng.choice(VOCABULARY) for _ in range(150)]
+        yield " ".join(words), {"source": f"synthetic-{i // 20}.pdf", "page": i % 20}, f"synthetic::{i}"
+
+def install_stand_ins(args, workdir):
+    """Points every external dependency of the graph at its offline stand-in. Returns a description."""
+    import utils.llm_api as llm_api
+    import utils.vector_store as vector_store
+    from utils.sandbox import set_sandbox_backend
+    from utils.sandbox.local_backend import LocalSandboxBackend
+    import utils.database as database
+
+    script = {}
+    if args.script:
+        with open(args.script, "r") as f:
+            script = json.load(f)
+    fake = FakeLLM(script, latency_ms=args.latency_ms, ms_per_1k_chars=args.ms_per_1k_chars)
+    llm_api._generate = lambda prompt, repo_id, generation_kwargs: fake.respond(prompt)
+    async def _agenerate(prompt, repo_id, generation_kwargs):
+        return fake.respond(prompt)
+    llm_api._agenerate = _agenerate
+    def _stream(prompt, repo_id, generation_kwargs):
+        text = fake.respond(prompt)
+        for i in range(0, len(text), 16):
+            yield text[i:i + 16]
+    llm_api._stream = _stream
+
+    vector_store._embeddings = HashingEmbeddings()
+    set_sandbox_backend(LocalSandboxBackend(workers=args.workers))
+
+    try:
+        import mongomock
+        database._db = mongomock.MongoClient()["autonomous_researcher_db"]
+        database.ensure_knowledge_graph_indexes(database._db["knowledge_graph"])
+        database.ensure_ledger_indexes(database._db["kg_extraction_ledger"])
+        database._connected = True
+        store = "mongomock"
+    except ImportError:
+        database._db = None
+        database._connected = False
+        store = "none (install mongomock to include knowledge-graph writes)"
+    return fake, store
+
+def build_index(size, batch_size, path):
+    """Embeds a synthetic corpus into a FAISS index at path and returns (seconds, peak traced bytes)."""
+    from utils.ingestion import embed_into_index
+    from utils.vector_store import get_embeddings, save_vector_store
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    db = embed_into_index(None, get_embeddings(), synthetic_chunks(size), batch_size=batch_size)
+    save_vector_store(db, path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def run_topics(topics, workers):
+    """Runs topics through the graph concurrently; returns per-run node timings and total wall time."""
+    from concurrent.futures import ThreadPoolExecutor
+    from graph import get_app, new_run_id, run_config
+    from utils.background import drain_background_tasks
+    from utils.metrics import summarize
+
+    app = get_app()
+
+    def run_one(topic):
+        run_id = new_run_id()
+        start = time.perf_counter()
+        final_state = app.invoke({"run_id": run_id, "topic": topic, "loop_count": 0}, run_config(run_id))
+        return {
+            "run_id": run_id,
+            "wall_s": time.perf_counter() - start,
+            "completed": bool(final_state.get("paper")),
+            "spans": summarize(run_id),
+        }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(run_one, topics))
+    drain_background_tasks()
+    return results, time.perf_counter() - start
+
+def aggregate(results):
+    """Median per-(kind, name) totals across runs."""
+    per_key = {}
+    for result in results:
+        for row in result["spans"]:
+            per_key.setdefault((row["kind"], row["name"]), []).append(row["total_s"])
+    return {f"{kind}:{name}": statistics.median(values) for (kind, name), values in sorted(per_key.items())}
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the research graph.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Synthetic corpus sizes, in chunks.")
+    parser.add_argument("--runs", type=int, default=4, help="Topics researched per corpus size.")
+    parser.add_argument("--workers", type=int, default=2, help="Topics researched concurrently.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed latency of each fake LLM call.")
+    parser.add_argument("--ms-per-1k-chars", type=float, default=0.0, help="Extra fake LLM latency per 1k prompt chars.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size for ingestion.")
+    parser.add_argument("--script", help="JSON file mapping response kinds to lists of scripted responses.")
+    parser.add_argument("--output", help="Write the full report as JSON to this path.")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="research-bench-")
+    # Everything the graph writes (checkpoints, caches, sandboxes, outputs) stays in the temp dir.
+    os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+    os.environ.setdefault("SANDBOX_CACHE_ENABLED", "0")
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(workdir, "checkpoints.sqlite")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, ".cache")
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+
+    fake, store = install_stand_ins(args, workdir)
+    import nodes.retriever as retriever
+
+    print(f"🧪 Benchmarking in {workdir} (knowledge-graph store: {store})")
+    report = {"args": vars(args), "store": store, "sizes": []}
+    for size in args.sizes:
+        index_path = os.path.join(workdir, f"faiss_index_{size}")
+        ingest_s, ingest_peak = build_index(size, args.batch_size, index_path)
+        retriever.FAISS_INDEX_PATH = index_path
+
+        topics = [f"{random.Random(i).choice(VOCABULARY)} {random.Random(i + 1).choice(VOCABULARY)} study {i}"
+                  for i in range(args.runs)]
+        tracemalloc.start()
+        results, wall_s = run_topics(topics, args.workers)
+        _, run_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entry = {
+            "chunks": size,
+            "ingest_s": ingest_s,
+            "ingest_chunks_per_s": size / ingest_s if ingest_s else None,
+            "ingest_peak_mb": ingest_peak / 2 ** 20,
+            "runs": len(results),
+            "completed": sum(result["completed"] for result in results),
+            "wall_s": wall_s,
+            "throughput_runs_per_min": 60 * len(results) / wall_s if wall_s else None,
+            "median_run_s": statistics.median(result["wall_s"] for result in results),
+            "run_peak_python_mb": run_peak / 2 ** 20,
+            "median_span_s": aggregate(results),
+        }
+        report["sizes"].append(entry)
+
+        print(f"\n📚 Corpus of {size} chunks: ingest {ingest_s:.2f}s "
+              f"({entry['ingest_chunks_per_s']:.0f} chunks/s, peak {entry['ingest_peak_mb']:.1f} MB)")
+        print(f"🚀 {entry['completed']}/{entry['runs']} runs completed in {wall_s:.2f}s "
+              f"({entry['throughput_runs_per_min']:.1f} runs/min, median {entry['median_run_s']:.2f}s per run, "
+              f"peak {entry['run_peak_python_mb']:.1f} MB Python heap)")
+        for key, value in entry["median_span_s"].items():
+            print(f"   {key:<40} {value * 1000:10.1f} ms")
+
+    report["llm_calls"] = dict(fake.calls)
+    report["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n🧠 Peak RSS: {report['max_rss_mb']:.1f} MB. Fake LLM calls: {report['llm_calls']}")
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to '{output_path}'")
+
+if __name__ == "__main__":
+    main()
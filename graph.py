@@ -1,7 +1,13 @@
 # FILE: graph.py
 
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
 from typing import TypedDict, List, Dict, Any
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.sqlite import SqliteSaver
 
 # Import all node functions
 from nodes.retriever import retriever_node
@@ -13,12 +19,18 @@ from nodes.sandbox_runner import sandbox_runner_node
 from nodes.analyzer import analyzer_node
 from nodes.reviewer import reviewer_node
 from nodes.paper_writer import paper_writer_node
+from utils.metrics import instrument_node
 
 MAX_LOOPS = 3
+# Every completed node is checkpointed here, keyed by run ID, so failed runs can be resumed.
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
 
 class GraphState(TypedDict):
+    run_id: str
     topic: str
+    index_paths: List[str]
     documents: List[str]
+    kg_context: str
     hypothesis: str
     experiment_plan: Dict[str, Any]
     code: str
@@ -28,6 +40,11 @@ class GraphState(TypedDict):
     decision: str
     paper: str
     loop_count: int
+    # Per-loop experiment candidates (plan, code, results, analysis) when num_candidates > 1.
+    num_candidates: int
+    candidates: List[Dict[str, Any]]
+    # "full" or "sections"; overrides PAPER_MODE for this run.
+    paper_mode: str
 
 def should_continue(state: GraphState) -> str:
     """Conditional edge to decide whether to proceed or redesign."""
@@ -45,24 +62,27 @@ def increment_loop_count(state: GraphState) -> Dict[str, Any]:
     count = state.get("loop_count", 0) + 1
     return {"loop_count": count}
 
-# Define the workflow
+# Define the workflow. Every node is timed and attributed to the run in its state.
 workflow = StateGraph(GraphState)
 
-workflow.add_node("retriever", retriever_node)
-workflow.add_node("knowledge_graph_updater", knowledge_graph_updater_node)
-workflow.add_node("hypothesis_generator", hypothesis_generator_node)
-workflow.add_node("experiment_designer", experiment_designer_node)
-workflow.add_node("code_synthesizer", code_synthesizer_node)
-workflow.add_node("sandbox_runner", sandbox_runner_node)
-workflow.add_node("analyzer", analyzer_node)
-workflow.add_node("reviewer", reviewer_node)
-workflow.add_node("paper_writer", paper_writer_node)
-workflow.add_node("increment_loop_count", increment_loop_count)
+workflow.add_node("retriever", instrument_node("retriever", retriever_node))
+workflow.add_node("knowledge_graph_updater", instrument_node("knowledge_graph_updater", knowledge_graph_updater_node))
+workflow.add_node("hypothesis_generator", instrument_node("hypothesis_generator", hypothesis_generator_node))
+workflow.add_node("experiment_designer", instrument_node("experiment_designer", experiment_designer_node))
+workflow.add_node("code_synthesizer", instrument_node("code_synthesizer", code_synthesizer_node))
+workflow.add_node("sandbox_runner", instrument_node("sandbox_runner", sandbox_runner_node))
+workflow.add_node("analyzer", instrument_node("analyzer", analyzer_node))
+workflow.add_node("reviewer", instrument_node("reviewer", reviewer_node))
+workflow.add_node("paper_writer", instrument_node("paper_writer", paper_writer_node))
+workflow.add_node("increment_loop_count", instrument_node("increment_loop_count", increment_loop_count))
 
 # Define the edges
 workflow.set_entry_point("retriever")
+# The knowledge graph update only queues background work, so it branches off
+# the retriever instead of sitting in front of hypothesis generation.
 workflow.add_edge("retriever", "knowledge_graph_updater")
-workflow.add_edge("knowledge_graph_updater", "hypothesis_generator")
+workflow.add_edge("retriever", "hypothesis_generator")
+workflow.add_edge("knowledge_graph_updater", END)
 workflow.add_edge("hypothesis_generator", "experiment_designer")
 workflow.add_edge("experiment_designer", "code_synthesizer")
 workflow.add_edge("code_synthesizer", "sandbox_runner")
@@ -75,5 +95,29 @@ workflow.add_conditional_edges("reviewer", should_continue, {
 workflow.add_edge("increment_loop_count", "experiment_designer")
 workflow.add_edge("paper_writer", END)
 
-# Compile the graph
-app = workflow.compile()
\ No newline at end of file
+def new_run_id() -> str:
+    """Returns a sortable, unique identifier for a research run."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def run_config(run_id: str) -> Dict[str, Any]:
+    """The LangGraph config that ties a stream/invoke call to a run's checkpoints."""
+    return {"configurable": {"thread_id": run_id}}
+
+def get_checkpointer() -> SqliteSaver:
+    conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+    return SqliteSaver(conn)
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """
+    Returns the compiled graph, compiling it on first use. The checkpoint database is
+    only opened then, so importing this module never creates checkpoints.sqlite.
+    """
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = workflow.compile(checkpointer=get_checkpointer())
+    return _app
\ No newline at end of file
@@ -1,40 +1,100 @@
 # FILE: ingest.py
 
+import hashlib
+import json
 import os
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from utils.ingestion import iter_split_files, embed_into_index
+from utils.vector_store import get_embeddings, save_vector_store
 
 CORPUS_PATH = "corpus"
 FAISS_INDEX_PATH = "faiss_index"
+# Records, per PDF, the content hash it was ingested at and the IDs of its chunks.
+MANIFEST_PATH = os.path.join(FAISS_INDEX_PATH, "manifest.json")
+
+def file_sha256(path):
+    """Hashes a file's contents in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest():
+    """Returns the manifest of the existing index, or an empty one if there is no usable index."""
+    if not os.path.exists(MANIFEST_PATH) or not os.path.exists(os.path.join(FAISS_INDEX_PATH, "index.faiss")):
+        return {"files": {}}
+    with open(MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def chunk_ids_for(file_name, sha256, count):
+    """Deterministic chunk IDs, so a file's chunks can be found and removed later."""
+    return [f"{file_name}::{sha256[:16]}::{i}" for i in range(count)]
 
 def main():
     print("🚀 Starting document ingestion process...")
-    print(f"📂 Loading documents from '{CORPUS_PATH}'...")
-    loader = PyPDFDirectoryLoader(CORPUS_PATH)
-    documents = loader.load()
-    if not documents:
+    print(f"📂 Scanning '{CORPUS_PATH}' for PDFs...")
+    os.makedirs(CORPUS_PATH, exist_ok=True)
+    pdf_files = sorted(f for f in os.listdir(CORPUS_PATH) if f.lower().endswith(".pdf"))
+    current = {name: file_sha256(os.path.join(CORPUS_PATH, name)) for name in pdf_files}
+
+    manifest = load_manifest()
+    indexed = manifest["files"]
+    stale = [name for name, entry in indexed.items() if current.get(name) != entry["sha256"]]
+    fresh = [name for name, sha in current.items() if name not in indexed or indexed[name]["sha256"] != sha]
+
+    if not current and not indexed:
         print(f"⚠️ No documents found in '{CORPUS_PATH}'. Please add some PDFs.")
         return
-    print(f"✅ Loaded {len(documents)} documents.")
-
-    print("쪼개기 Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-    docs = text_splitter.split_documents(documents)
-    print(f"✅ Split into {len(docs)} chunks.")
+    if not stale and not fresh:
+        print(f"✅ Index is up to date with {len(current)} documents. Nothing to do.")
+        return
+    print(f"✅ Found {len(fresh)} new or changed and {len(stale) - len(set(stale) & set(fresh))} deleted documents.")
 
     print("🧠 Initializing embedding model...")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    embeddings = get_embeddings()
     print("✅ Embedding model initialized.")
 
-    print("💾 Creating FAISS vector store...")
-    db = FAISS.from_documents(docs, embeddings)
-    print("✅ FAISS vector store created.")
+    db = None
+    if indexed:
+        db = FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+
+    stale_ids = [chunk_id for name in stale for chunk_id in indexed[name]["chunk_ids"]]
+    if stale_ids:
+        print(f"🗑️ Removing {len(stale_ids)} chunks from deleted or changed documents...")
+        db.delete(stale_ids)
+    for name in stale:
+        del indexed[name]
+
+    def fresh_chunks():
+        # PDFs are parsed in worker processes while earlier files are being embedded.
+        paths = [os.path.join(CORPUS_PATH, name) for name in fresh]
+        for path, chunks in iter_split_files(paths, loader="pypdf"):
+            name = os.path.basename(path)
+            ids = chunk_ids_for(name, current[name], len(chunks))
+            indexed[name] = {"sha256": current[name], "chunk_ids": ids}
+            print(f"✅ Split '{name}' into {len(chunks)} chunks.")
+            for (text, metadata), chunk_id in zip(chunks, ids):
+                yield text, metadata, chunk_id
+
+    print(f"💾 Embedding {len(fresh)} documents into the FAISS vector store...")
+    db = embed_into_index(db, embeddings, fresh_chunks())
+
+    if db is None:
+        print("⚠️ No text could be extracted from the documents. Index not saved.")
+        return
 
     print(f"Saving FAISS index to '{FAISS_INDEX_PATH}'...")
-    db.save_local(FAISS_INDEX_PATH)
+    save_vector_store(db, FAISS_INDEX_PATH)
+    save_manifest(manifest)
     print(f"🎉 Ingestion complete! FAISS index saved successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
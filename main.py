@@ -3,45 +3,152 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from graph import app
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
 import pprint
-import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the autonomous scientific researcher.")
+    parser.add_argument("topic", nargs="*", help="Research topic. Prompted for if omitted.")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a previous run from its last completed node.")
+    parser.add_argument("--batch", metavar="FILE", help="Run every topic in FILE (one per line) in this process.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "4")),
+                        help="Number of topics researched concurrently in batch mode.")
+    return parser.parse_args()
+
+def run_topic(topic):
+    """Runs one topic to completion and writes its final state to outputs/<run-id>/state.json."""
+    from graph import get_app, new_run_id, run_config
+    from utils.background import drain_background_tasks
+    from utils.metrics import export_run
+    from utils.run_outputs import get_run_output_dir
+    app = get_app()
+    run_id = new_run_id()
+    print(f"🚀 [{run_id}] Starting: {topic}")
+    try:
+        final_state = app.invoke({"run_id": run_id, "topic": topic, "loop_count": 0}, run_config(run_id))
+        status = "completed" if final_state.get("paper") else "no paper"
+    except Exception as e:
+        print(f"❌ [{run_id}] Failed: {e}")
+        final_state = app.get_state(run_config(run_id)).values
+        status = f"failed: {e}"
+    output_dir = get_run_output_dir(run_id)
+    with open(os.path.join(output_dir, "state.json"), "w") as f:
+        json.dump(final_state, f, indent=2, default=str)
+    # The run's background knowledge-graph update must finish before its metrics are exported.
+    drain_background_tasks(run_id=run_id)
+    export_run(run_id, output_dir)
+    print(f"🏁 [{run_id}] {status}")
+    return run_id, topic, status
+
+def run_batch(path, workers):
+    """
+    Researches many topics concurrently in one process. All runs share the loaded
+    embedding model and index, the pooled LLM clients and the database connection.
+    """
+    from utils.background import drain_background_tasks
+
+    with open(path, "r") as f:
+        topics = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not topics:
+        print(f"❌ No topics found in '{path}'. Exiting.")
+        return
+
+    workers = max(1, min(workers, len(topics)))
+    print(f"🚀 Researching {len(topics)} topics with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research") as executor:
+        outcomes = list(executor.map(run_topic, topics))
+
+    drain_background_tasks()
+    print("-" * 50)
+    for run_id, topic, status in outcomes:
+        print(f"🆔 {run_id}  {status:<12}  {topic}")
+    print("🏁 Batch finished. Results are in outputs/<run-id>/.")
 
 def main():
     """
     Main function to run the autonomous researcher graph.
     It can take a research topic as a command-line argument,
     or it will prompt the user for one if none is provided.
+    A run that failed part-way can be resumed with --resume RUN_ID.
     """
-    topic = ""
-    
-    # Check if a topic was passed as a command-line argument
-    if len(sys.argv) > 1:
-        # Join all arguments to form the topic string
-        topic = " ".join(sys.argv[1:])
-        print(f"🔬 Topic provided via command-line: '{topic}'")
-    else:
-        # If no command-line argument is given, prompt the user for input
-        topic = input("❓ Please enter the research topic you want to investigate: ")
+    args = parse_args()
+    # Imported after argument parsing so `--help` and usage errors return immediately.
+    from graph import get_app, new_run_id, run_config
+    from utils.background import drain_background_tasks
+    from utils.metrics import export_run, format_summary
+    from utils.run_outputs import get_run_output_dir
 
-    if not topic:
-        print("❌ No topic provided. Exiting.")
+    if args.batch:
+        run_batch(args.batch, args.workers)
         return
 
-    # Initial state for the graph
-    inputs = {"topic": topic, "loop_count": 0}
+    app = get_app()
+    if args.resume:
+        run_id = args.resume
+        config = run_config(run_id)
+        snapshot = app.get_state(config)
+        if not snapshot.values:
+            print(f"❌ No checkpoint found for run '{run_id}'. Exiting.")
+            return
+        if not snapshot.next:
+            print(f"✅ Run '{run_id}' already finished. Nothing to resume.")
+            return
+        print(f"🔁 Resuming run '{run_id}' at: {', '.join(snapshot.next)}")
+        inputs = None
+    else:
+        topic = ""
+
+        # Check if a topic was passed as a command-line argument
+        if args.topic:
+            # Join all arguments to form the topic string
+            topic = " ".join(args.topic)
+            print(f"🔬 Topic provided via command-line: '{topic}'")
+        else:
+            # If no command-line argument is given, prompt the user for input
+            topic = input("❓ Please enter the research topic you want to investigate: ")
+
+        if not topic:
+            print("❌ No topic provided. Exiting.")
+            return
+
+        run_id = new_run_id()
+        config = run_config(run_id)
+        # Initial state for the graph
+        inputs = {"run_id": run_id, "topic": topic, "loop_count": 0}
+
+        print("🚀 Starting the Autonomous Scientific Researcher...")
+        print(f"▶️  Topic: {inputs['topic']}")
 
-    print("🚀 Starting the Autonomous Scientific Researcher...")
-    print(f"▶️  Topic: {inputs['topic']}")
+    print(f"🆔 Run ID: {run_id} (resume with: python main.py --resume {run_id})")
     print("-" * 50)
 
-    for output in app.stream(inputs):
+    streaming = False
+    for mode, output in app.stream(inputs, config, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            # Tokens from nodes that stream their LLM output (e.g. the paper writer).
+            print(output.get("token", ""), end="", flush=True)
+            streaming = True
+            continue
+        if streaming:
+            print()
+            streaming = False
         for key, value in output.items():
             print(f"✅ Output from node '{key}':")
+            if key == "paper_writer":
+                # The paper was already printed as it streamed.
+                value = {k: v for k, v in value.items() if k != "paper"}
             pprint.pprint(value, indent=2, width=120, depth=None)
         print("-" * 50)
 
+    drain_background_tasks()
+    print("⏱️ Timing summary:")
+    print(format_summary(run_id))
+    exported = export_run(run_id, get_run_output_dir(run_id))
+    print(f"📈 Trace written to '{exported['trace']}', metrics to '{exported['prometheus']}'.")
     print("🏁 Research process finished.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
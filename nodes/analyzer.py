@@ -1,14 +1,19 @@
 # FILE: nodes/analyzer.py
 
 from typing import Dict, Any
-from utils.llm_api import query_huggingface_api
+from utils.candidates import map_candidates
+from utils.llm_api import generation_profile, query_huggingface_api
 import json
 
-def analyzer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("---NODE: ANALYZER---")
-    results = state.get("results", {})
+# A one-paragraph summary.
+ANALYSIS_PROFILE = generation_profile("analyzer", max_new_tokens=384, temperature=0.3)
+
+FAILED_ANALYSIS = "The experiment failed to run. Cannot analyze results."
+
+def analyze_results(results: Dict[str, Any]) -> str:
+    """Summarizes one experiment's results with the LLM."""
     if "error" in results:
-        return {"analysis": "The experiment failed to run. Cannot analyze results."}
+        return FAILED_ANALYSIS
 
     results_str = json.dumps(results, indent=2)
     prompt = f"""
@@ -19,7 +24,23 @@ def analyzer_node(state: Dict[str, Any]) -> Dict[str, Any]:
 
     **Analysis Summary:**
     """
+    return query_huggingface_api(prompt, **ANALYSIS_PROFILE)
+
+def analyzer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    print("---NODE: ANALYZER---")
+    candidates = state.get("candidates") or []
+    if candidates:
+        # Failed candidates get the fixed failure analysis without an LLM call.
+        print(f"📈 Analyzing results of {len(candidates)} candidates concurrently...")
+        analyses = map_candidates(lambda candidate: analyze_results(candidate["results"]), candidates)
+        candidates = [{**candidate, "analysis": analysis} for candidate, analysis in zip(candidates, analyses)]
+        print("✅ Analysis complete for every candidate.")
+        return {"analysis": analyses[0], "candidates": candidates}
+
+    results = state.get("results", {})
+    if "error" in results:
+        return {"analysis": FAILED_ANALYSIS}
     print("📈 Analyzing results...")
-    analysis = query_huggingface_api(prompt)
+    analysis = analyze_results(results)
     print(f"✅ Analysis complete: {analysis}")
     return {"analysis": analysis}
\ No newline at end of file
@@ -1,14 +1,16 @@
 # FILE: nodes/code_synthesizer.py
 
 from typing import Dict, Any
-from utils.llm_api import query_huggingface_api
+from utils.candidates import map_candidates
+from utils.llm_api import generation_profile, query_huggingface_api
 import pprint
 import re
 
-# CORRECTED FUNCTION SIGNATURE
-def code_synthesizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("---NODE: CODE SYNTHESIZER---")
-    plan = state.get("experiment_plan")
+# Code needs room but little randomness.
+CODE_PROFILE = generation_profile("code_synthesizer", max_new_tokens=2048, temperature=0.2)
+
+def synthesize_code(plan: Dict[str, Any]) -> Dict[str, str]:
+    """Asks the LLM for an experiment script implementing plan; returns its code and Dockerfile."""
     plan_str = pprint.pformat(plan)
 
     prompt = f"""
@@ -30,8 +32,7 @@ def code_synthesizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     ```
     """
 
-    print("🤖 Generating experiment code...")
-    response = query_huggingface_api(prompt)
+    response = query_huggingface_api(prompt, **CODE_PROFILE)
     
     match = re.search(r"```python\n(.*)```", response, re.DOTALL)
     if match:
@@ -39,9 +40,6 @@ def code_synthesizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     else:
         cleaned_code = response.strip()
 
-    print("✅ Generated Code:")
-    print(cleaned_code)
-
     dockerfile = f"""
 FROM python:3.9-slim
 WORKDIR /app
@@ -49,5 +47,36 @@ RUN pip install pandas scikit-learn numpy
 COPY experiment.py .
 CMD ["python", "experiment.py"]
 """
+    return {"code": cleaned_code, "dockerfile": dockerfile}
+
+# CORRECTED FUNCTION SIGNATURE
+def code_synthesizer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    print("---NODE: CODE SYNTHESIZER---")
+    candidates = state.get("candidates") or []
+    if candidates:
+        def synthesize_candidate(candidate):
+            # One failed call drops its candidate instead of the whole batch.
+            try:
+                return synthesize_code(candidate["experiment_plan"])
+            except Exception as e:
+                print(f"❗️ Failed to generate code for a candidate: {e}")
+                return e
+
+        print(f"🤖 Generating experiment code for {len(candidates)} candidates concurrently...")
+        scripts = map_candidates(synthesize_candidate, candidates)
+        failures = [script for script in scripts if isinstance(script, Exception)]
+        candidates = [{**candidate, **script} for candidate, script in zip(candidates, scripts)
+                      if not isinstance(script, Exception)]
+        if not candidates:
+            raise failures[0]
+        print(f"✅ Generated code and Dockerfiles for {len(candidates)} of {len(scripts)} candidates.")
+        first = candidates[0]
+        return {"experiment_plan": first["experiment_plan"], "code": first["code"],
+                "dockerfile": first["dockerfile"], "candidates": candidates}
+
+    print("🤖 Generating experiment code...")
+    script = synthesize_code(state.get("experiment_plan"))
+    print("✅ Generated Code:")
+    print(script["code"])
     print("\n✅ Generated Dockerfile.")
-    return {"code": cleaned_code, "dockerfile": dockerfile}
\ No newline at end of file
+    return script
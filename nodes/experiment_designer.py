@@ -1,16 +1,18 @@
 # FILE: nodes/experiment_designer.py
 
-import json
 from typing import Dict, Any
 import pprint
-from utils.llm_api import query_huggingface_api
-import re
+from utils.candidates import map_candidates, num_candidates
+from utils.llm_api import generation_profile
+from utils.structured_output import StructuredOutputError, query_structured
 
-# CORRECTED FUNCTION SIGNATURE
-def experiment_designer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("---NODE: EXPERIMENT DESIGNER---")
-    hypothesis = state.get("hypothesis", "")
-    
+# The plan is one fenced JSON object; generation stops at its closing fence.
+DESIGN_PROFILE = generation_profile("experiment_designer", max_new_tokens=1024, temperature=0.5,
+                                    stop_sequences=["\n```\n"])
+PLAN_SCHEMA = {"type": "object", "required": ["datasets", "methodology", "metrics"]}
+
+def design_experiment(hypothesis: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Asks the LLM for a JSON experiment plan. Raises StructuredOutputError (a ValueError) if none can be parsed."""
     prompt = f"""
     You are a meticulous lab director. Design a detailed experiment to test the hypothesis: "{hypothesis}"
     
@@ -30,22 +32,39 @@ def experiment_designer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     ```
     """
 
-    print("📝 Designing experiment plan...")
-    response_text = query_huggingface_api(prompt)
-    
-    match = re.search(r"```json\n({.*?})\n```", response_text, re.DOTALL)
-    
+    # Unparseable plans are repaired with a short follow-up call instead of failing the run.
     try:
-        if match:
-            json_str = match.group(1)
-        else:
-            json_str = response_text[response_text.find('{'):response_text.rfind('}')+1]
+        return query_structured(prompt, PLAN_SCHEMA, use_cache=use_cache, **DESIGN_PROFILE)
+    except StructuredOutputError as e:
+        print(f"❗️ Error: Failed to parse JSON from LLM response. Error: {e}")
+        print(f"Raw response was: {e.output}")
+        raise StructuredOutputError("Could not generate a valid JSON experiment plan.", e.output) from e
 
-        experiment_plan = json.loads(json_str)
+# CORRECTED FUNCTION SIGNATURE
+def experiment_designer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    print("---NODE: EXPERIMENT DESIGNER---")
+    hypothesis = state.get("hypothesis", "")
+    # Redesign loops need a fresh plan for the same hypothesis, so skip the cache.
+    first_loop = state.get("loop_count", 0) == 0
+    count = num_candidates(state)
+
+    if count == 1:
+        print("📝 Designing experiment plan...")
+        experiment_plan = design_experiment(hypothesis, use_cache=first_loop)
         print("✅ Experiment Plan Generated:")
         pprint.pprint(experiment_plan)
-        return {"experiment_plan": experiment_plan}
-    except (json.JSONDecodeError, IndexError) as e:
-        print(f"❗️ Error: Failed to parse JSON from LLM response. Error: {e}")
-        print(f"Raw response was: {response_text}")
-        raise ValueError("Could not generate a valid JSON experiment plan.")
\ No newline at end of file
+        return {"experiment_plan": experiment_plan, "candidates": []}
+
+    def design_candidate(index):
+        # Only the first candidate may come from the cache; the others must differ from it.
+        try:
+            return design_experiment(hypothesis, use_cache=first_loop and index == 0)
+        except ValueError:
+            return None
+
+    print(f"📝 Designing {count} candidate experiment plans concurrently...")
+    plans = [plan for plan in map_candidates(design_candidate, list(range(count))) if plan is not None]
+    if not plans:
+        raise ValueError("Could not generate a valid JSON experiment plan.")
+    print(f"✅ {len(plans)} of {count} candidate plans generated.")
+    return {"experiment_plan": plans[0], "candidates": [{"experiment_plan": plan} for plan in plans]}
@@ -1,12 +1,21 @@
 # FILE: nodes/hypothesis_generator.py
 
 from typing import Dict, Any
-from utils.llm_api import query_huggingface_api
+from utils.context_packing import HYPOTHESIS_CONTEXT_TOKENS, KG_CONTEXT_TOKENS, pack_context, pack_lines
+from utils.llm_api import generation_profile, query_huggingface_api
+from utils.metrics import increment
+
+# A single sentence; a little extra temperature for more varied ideas.
+HYPOTHESIS_PROFILE = generation_profile("hypothesis_generator", max_new_tokens=160, temperature=0.7)
 
 def hypothesis_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("---NODE: HYPOTHESIS GENERATOR---")
     documents = state.get("documents", [])
-    context = "\n\n---\n\n".join(documents)
+    # Overlap and near-duplicates are removed and the rest fitted to the prompt's token budget.
+    context = pack_context(documents, state.get("topic", ""), HYPOTHESIS_CONTEXT_TOKENS)
+    kg_context = pack_lines(state.get("kg_context", ""), KG_CONTEXT_TOKENS)
+    if kg_context:
+        context += f"\n\n---\n\n**Known relations from the knowledge graph:**\n{kg_context}"
 
     prompt = f"""
     You are a senior research scientist. Based on the following research context, identify a knowledge gap and formulate a single, clear, testable scientific hypothesis.
@@ -19,7 +28,9 @@ def hypothesis_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Hypothesis:
     """
 
+    increment("context_chars_packed", len(context))
+    increment("context_chars_retrieved", sum(len(doc) for doc in documents))
     print("🧠 Generating hypothesis...")
-    hypothesis = query_huggingface_api(prompt)
+    hypothesis = query_huggingface_api(prompt, **HYPOTHESIS_PROFILE)
     print(f"✅ Generated Hypothesis: {hypothesis}")
     return {"hypothesis": hypothesis}
\ No newline at end of file
@@ -1,19 +1,25 @@
 # FILE: nodes/knowledge_graph_updater.py
 
-import json
-from typing import Dict, Any
-from utils.database import knowledge_graph_collection
-from utils.llm_api import query_huggingface_api
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from utils.background import submit_background
+from utils.context_packing import KG_EXTRACTION_TOKENS, drop_near_duplicates, truncate_to_tokens
+from utils.database import get_knowledge_graph_collection, get_extraction_ledger_collection
+from utils.disk_cache import content_hash
+from utils.graph_index import normalize_entity, record_triples
+from utils.llm_api import generation_profile
+from utils.structured_output import query_structured
+from utils.metrics import in_current_context
 
-def knowledge_graph_updater_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("---NODE: KNOWLEDGE GRAPH UPDATER---")
-    documents = state.get("documents", [])
-    if not documents: return {}
-    if knowledge_graph_collection is None:
-        print("❌ MongoDB connection not available. Skipping.")
-        return {}
-        
-    prompt_template = """
+# Upper bound on simultaneous extraction requests sent to the LLM endpoint.
+KG_MAX_CONCURRENCY = int(os.getenv("KG_MAX_CONCURRENCY", "4"))
+# Most recent (chunk hash, run ID) pairs kept on each triple.
+PROVENANCE_LIMIT = 20
+
+PROMPT_TEMPLATE = """
     From the research document text below, extract key entities and their relationships.
     Extract entity types: 'concept', 'method', 'metric'.
     Format the output as a valid JSON list of objects. Each object must have 'source_entity', 'relation', and 'target_entity' keys.
@@ -26,22 +32,141 @@ def knowledge_graph_updater_node(state: Dict[str, Any]) -> Dict[str, Any]:
     JSON Output:
     """
 
-    all_relations = []
-    for doc in documents:
-        # The .format call will now correctly ignore the escaped braces in the example
-        prompt = prompt_template.format(document_text=doc)
-        try:
-            response_text = query_huggingface_api(prompt)
-            cleaned_response = response_text[response_text.find('['):response_text.rfind(']')+1]
-            extracted_relations = json.loads(cleaned_response)
-            all_relations.extend(extracted_relations)
-        except Exception as e:
-            print(f"❗️ Failed to extract relations from a document: {e}")
-
-    if all_relations:
-        print(f"📝 Inserting {len(all_relations)} new relations into the knowledge graph...")
-        knowledge_graph_collection.insert_many(all_relations)
-        print("✅ Knowledge graph updated.")
+# A JSON list of triples per chunk, extracted as deterministically as the endpoint allows.
+EXTRACTION_PROFILE = generation_profile("knowledge_graph", max_new_tokens=1024, temperature=0.1)
+RELATIONS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "object", "required": ["source_entity", "relation", "target_entity"]},
+}
+
+# Ledger entries are only trusted for the prompt and model that produced them. The chunk
+# truncation budget shapes the effective prompt, so it is part of the version too.
+PROMPT_VERSION = content_hash(PROMPT_TEMPLATE, KG_EXTRACTION_TOKENS)[:16]
+EXTRACTION_MODEL = EXTRACTION_PROFILE["repo_id"]
+
+_ledger_swept = False
+_ledger_lock = threading.Lock()
+
+def invalidate_stale_ledger_entries() -> None:
+    """Drops ledger entries from another prompt version or model, once per process."""
+    global _ledger_swept
+    with _ledger_lock:
+        if _ledger_swept:
+            return
+        result = get_extraction_ledger_collection().delete_many(
+            {"$or": [{"prompt_version": {"$ne": PROMPT_VERSION}}, {"model": {"$ne": EXTRACTION_MODEL}}]}
+        )
+        if result.deleted_count:
+            print(f"♻️ Invalidated {result.deleted_count} extraction ledger entries from an older prompt or model.")
+        _ledger_swept = True
+
+def already_extracted(chunk_hashes: List[str]) -> set:
+    """Returns the hashes of chunks extracted before with the current prompt and model."""
+    invalidate_stale_ledger_entries()
+    cursor = get_extraction_ledger_collection().find(
+        {"_id": {"$in": chunk_hashes}, "prompt_version": PROMPT_VERSION, "model": EXTRACTION_MODEL},
+        {"_id": 1},
+    )
+    return {entry["_id"] for entry in cursor}
+
+def extract_relations(doc: str) -> Optional[List[Dict[str, Any]]]:
+    """Extracts relations from one chunk, repairing malformed output. Failures are logged and return None."""
+    # The .format call will now correctly ignore the escaped braces in the example
+    prompt = PROMPT_TEMPLATE.format(document_text=truncate_to_tokens(doc, KG_EXTRACTION_TOKENS))
+    try:
+        return query_structured(prompt, RELATIONS_SCHEMA, **EXTRACTION_PROFILE)
+    except Exception as e:
+        print(f"❗️ Failed to extract relations from a document: {e}")
+        return None
+
+def build_upsert(relation: Any, chunk_hash: str, run_id: str, now: datetime):
+    """Turns one extracted relation into an upsert on its normalized triple, or None if malformed."""
+    from pymongo import UpdateOne
+    if not isinstance(relation, dict):
+        return None
+    values = [relation.get(key) for key in ("source_entity", "relation", "target_entity")]
+    keys = [normalize_entity(value) for value in values if value is not None]
+    if len(keys) != 3 or not all(keys):
+        return None
+    source_key, relation_key, target_key = keys
+    return UpdateOne(
+        {"source_key": source_key, "relation_key": relation_key, "target_key": target_key},
+        {
+            "$setOnInsert": {
+                "source_entity": " ".join(str(values[0]).split()),
+                "relation": " ".join(str(values[1]).split()),
+                "target_entity": " ".join(str(values[2]).split()),
+                "first_seen": now,
+            },
+            "$set": {"last_seen": now},
+            "$inc": {"count": 1},
+            "$push": {"provenance": {"$each": [{"chunk_hash": chunk_hash, "run_id": run_id}], "$slice": -PROVENANCE_LIMIT}},
+        },
+        upsert=True,
+    )
+
+def update_knowledge_graph(documents: List[str], run_id: str = "") -> None:
+    """
+    Extracts relations from chunks not yet in the extraction ledger, upserts them into
+    MongoDB in one bulk write, then records the successfully extracted chunks in the ledger.
+    """
+    # Near-duplicate chunks would only yield the same relations again.
+    chunks = {content_hash(doc): doc for doc in drop_near_duplicates(documents)}
+    done = already_extracted(list(chunks))
+    pending = [(chunk_hash, doc) for chunk_hash, doc in chunks.items() if chunk_hash not in done]
+    if done:
+        print(f"⏭️ Skipping {len(done)} chunks already in the knowledge graph.")
+    if not pending:
+        print("✅ Knowledge graph already covers every retrieved chunk.")
+        return
+
+    from pymongo import UpdateOne
+    max_workers = max(1, min(KG_MAX_CONCURRENCY, len(pending)))
+    print(f"🔗 Extracting relations from {len(pending)} documents ({max_workers} at a time)...")
+    now = datetime.now(timezone.utc)
+    operations = []
+    triples = []
+    ledger_operations = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(in_current_context(extract_relations), [doc for _, doc in pending])
+        for (chunk_hash, _), extracted_relations in zip(pending, results):
+            if extracted_relations is None:
+                continue
+            for relation in extracted_relations:
+                operation = build_upsert(relation, chunk_hash, run_id, now)
+                if operation is not None:
+                    operations.append(operation)
+                    triples.append((relation["source_entity"], relation["relation"], relation["target_entity"]))
+            ledger_operations.append(UpdateOne(
+                {"_id": chunk_hash},
+                {"$set": {"prompt_version": PROMPT_VERSION, "model": EXTRACTION_MODEL,
+                          "relation_count": len(extracted_relations), "extracted_at": now}},
+                upsert=True,
+            ))
+
+    if operations:
+        print(f"📝 Upserting {len(operations)} relations into the knowledge graph...")
+        result = get_knowledge_graph_collection().bulk_write(operations, ordered=False)
+        print(f"✅ Knowledge graph updated: {result.upserted_count} new, {result.matched_count} existing.")
+        record_triples(triples)
     else:
         print("🤷 No new relations were extracted.")
-    return {}
\ No newline at end of file
+    # Written after the triples, so a failed write never marks a chunk as done.
+    if ledger_operations:
+        get_extraction_ledger_collection().bulk_write(ledger_operations, ordered=False)
+
+def knowledge_graph_updater_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queues knowledge-graph extraction on the background worker and returns at once.
+    Nothing downstream reads the graph updates, so the research run does not wait for them.
+    """
+    print("---NODE: KNOWLEDGE GRAPH UPDATER---")
+    documents = state.get("documents", [])
+    if not documents: return {}
+    if get_knowledge_graph_collection() is None:
+        print("❌ MongoDB connection not available. Skipping.")
+        return {}
+
+    submit_background("knowledge_graph_updater", update_knowledge_graph, list(documents), state.get("run_id", ""))
+    print("📬 Knowledge graph update queued in the background.")
+    return {}
@@ -1,12 +1,123 @@
 # FILE: nodes/paper_writer.py
 
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
-from utils.llm_api import query_huggingface_api
+from langgraph.config import get_stream_writer
+from utils.llm_api import generation_profile, query_huggingface_api, stream_huggingface_api
+from utils.metrics import in_current_context
+from utils.run_outputs import get_run_output_dir
+
+# "full" writes the paper in one streamed completion; "sections" drafts the sections concurrently.
+PAPER_MODE = os.getenv("PAPER_MODE", "full")
+# Token cap for each section in "sections" mode.
+PAPER_SECTION_MAX_TOKENS = int(os.getenv("PAPER_SECTION_MAX_TOKENS", "1024"))
+
+PAPER_PROFILE = generation_profile("paper_writer", max_new_tokens=4096, temperature=0.5)
+SECTION_PROFILE = generation_profile("paper_section", max_new_tokens=PAPER_SECTION_MAX_TOKENS, temperature=0.5)
+
+# Drafted first, in parallel, straight from the run's state.
+BODY_SECTIONS = {
+    "Methodology": "Describe the experiment based on the plan: data, procedure, baselines and metrics.",
+    "Results": "Present the results, quoting the key numbers exactly as reported.",
+    "Discussion": "Interpret the results based on the analysis, including limitations.",
+}
+# Drafted second, in parallel, from the body drafts so they summarize what the paper actually says.
+FRAMING_SECTIONS = {
+    "Abstract": "A brief summary of the work in one paragraph.",
+    "Introduction": "Background on the topic and statement of the hypothesis.",
+    "Conclusion": "Summarize the findings and future work.",
+}
+SECTION_ORDER = ["Abstract", "Introduction", "Methodology", "Results", "Discussion", "Conclusion"]
+
+def _token_writer():
+    """LangGraph's custom stream writer, or a no-op when the node runs outside a graph."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda payload: None
+
+def _strip_heading(name: str, text: str) -> str:
+    """
+    Drops a leading heading the model may repeat, since the stitched paper adds its own.
+    Only real heading markup counts: a leading '#' or '**', or the name followed by ':' or
+    a line break. Prose that merely starts with the name ("Results indicate...") is kept.
+    """
+    text = text.strip()
+    number = r"(?:\d+\.\s*)?"
+    patterns = [
+        rf"^#+\s*{number}{name}\b[^\n]*(?:\n|$)",
+        rf"^\*\*{number}{name}\b[^*\n]*\*\*:?",
+        rf"^{number}{name}\s*(?::|\n|$)",
+    ]
+    for pattern in patterns:
+        match = re.match(pattern, text, flags=re.IGNORECASE)
+        if match:
+            return text[match.end():].strip()
+    return text
+
+def _write_section(name: str, instruction: str, material: str) -> str:
+    prompt = f"""
+    You are a research assistant writing one section of a research paper in Markdown format.
+
+    {material}
+
+    **Instructions:**
+    Write only the **{name}** section. {instruction}
+    Do not include the section heading or any other section.
+    """
+    return _strip_heading(name, query_huggingface_api(prompt, **SECTION_PROFILE))
+
+def _draft_sections(sections: Dict[str, str], material: str) -> Dict[str, str]:
+    with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="paper-section") as executor:
+        futures = {name: executor.submit(in_current_context(_write_section), name, instruction, material)
+                   for name, instruction in sections.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def write_paper_in_sections(state: Dict[str, Any]) -> str:
+    """
+    Drafts Methodology, Results and Discussion concurrently, then Abstract, Introduction
+    and Conclusion from those drafts, and stitches them in paper order. Latency is two
+    section-sized calls instead of one paper-sized call.
+    """
+    plan = state.get("experiment_plan") or {}
+    material = f"""**Topic:** {state.get("topic")}
+    **Hypothesis:** {state.get("hypothesis")}
+    **Methodology:** {plan.get('methodology', 'N/A')}
+    **Datasets:** {plan.get('datasets', 'N/A')}
+    **Metrics:** {plan.get('metrics', 'N/A')}
+    **Results:** {state.get("results")}
+    **Analysis/Discussion:** {state.get("analysis")}"""
+    print(f"✍️ Drafting {', '.join(BODY_SECTIONS)} concurrently...")
+    drafts = _draft_sections(BODY_SECTIONS, material)
+
+    body = "\n\n".join(f"## {name}\n{text}" for name, text in drafts.items())
+    framing_material = f"""**Topic:** {state.get("topic")}
+    **Hypothesis:** {state.get("hypothesis")}
+
+    **Draft of the paper body:**
+    {body}"""
+    print(f"✍️ Drafting {', '.join(FRAMING_SECTIONS)} from the body...")
+    drafts.update(_draft_sections(FRAMING_SECTIONS, framing_material))
+
+    title = f"# {state.get('topic') or 'Research Paper'}"
+    return "\n\n".join([title] + [f"## {name}\n\n{drafts[name]}" for name in SECTION_ORDER])
 
 def paper_writer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("---NODE: PAPER WRITER---")
-    
+    # Each run writes to its own directory so concurrent runs don't overwrite each other.
+    filename = os.path.join(get_run_output_dir(state.get("run_id", "")), "research_paper.md")
+    writer = _token_writer()
+
+    if (state.get("paper_mode") or PAPER_MODE) == "sections":
+        paper = write_paper_in_sections(state)
+        with open(filename, "w") as f:
+            f.write(paper)
+        writer({"node": "paper_writer", "token": paper})
+        print(f"✅ Final paper saved to '{filename}'")
+        return {"paper": paper}
+
     # Gather all content from the state
     topic = state.get("topic")
     hypothesis = state.get("hypothesis")
@@ -35,12 +146,15 @@ def paper_writer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     The paper should be comprehensive and well-written.
     """
     print("✍️ Writing final paper...")
-    paper = query_huggingface_api(prompt)
-    
-    os.makedirs("outputs", exist_ok=True)
-    filename = "outputs/research_paper.md"
+    # Tokens go to the file and to graph.stream(stream_mode="custom") as they arrive.
+    chunks = []
     with open(filename, "w") as f:
-        f.write(paper)
+        for chunk in stream_huggingface_api(prompt, **PAPER_PROFILE):
+            chunks.append(chunk)
+            f.write(chunk)
+            f.flush()
+            writer({"node": "paper_writer", "token": chunk})
+    paper = "".join(chunks).strip()
     
     print(f"✅ Final paper saved to '{filename}'")
     return {"paper": paper}
\ No newline at end of file
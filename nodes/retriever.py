@@ -2,10 +2,13 @@
 
 import os
 from typing import Dict, Any
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from utils.graph_index import get_graph_index
+from utils.metrics import span
+from utils.vector_store import get_vector_store, search_shards
 
 FAISS_INDEX_PATH = "faiss_index"
+# Chunks fetched per search; the hypothesis prompt packs them into its own token budget.
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
 
 def retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("---NODE: RETRIEVER---")
@@ -13,15 +16,31 @@ def retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
     if not topic: raise ValueError("Topic not set.")
 
     print(f"🔎 Retrieving documents for topic: '{topic}'")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-    if not os.path.exists(FAISS_INDEX_PATH):
-        raise FileNotFoundError(f"FAISS index not found. Please run ingest.py first.")
-
-    db = FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
-    retriever = db.as_retriever(search_kwargs={'k': 5})
-    retrieved_docs = retriever.invoke(topic)
+    # The embedding model and indexes stay loaded between runs; an index is
+    # only re-read when ingestion has changed its files on disk.
+    index_paths = state.get("index_paths")
+    if index_paths:
+        print(f"🗂️ Searching {len(index_paths)} document indexes...")
+        with span("retrieval", "shards", shards=len(index_paths)):
+            retrieved_docs = search_shards(index_paths, topic, k=RETRIEVAL_K)
+    else:
+        with span("retrieval", "load_index"):
+            db = get_vector_store(FAISS_INDEX_PATH)
+        with span("retrieval", "search"):
+            retriever = db.as_retriever(search_kwargs={'k': RETRIEVAL_K})
+            retrieved_docs = retriever.invoke(topic)
     documents = [doc.page_content for doc in retrieved_docs]
     
     print(f"✅ Retrieved {len(documents)} documents.")
-    return {"documents": documents}
\ No newline at end of file
+
+    # Relations already known around the entities the topic mentions. The knowledge graph
+    # is optional context, so a database problem must not abort the run.
+    try:
+        with span("retrieval", "knowledge_graph"):
+            kg_context = get_graph_index().describe(topic, hops=2, limit=20)
+    except Exception as e:
+        print(f"⚠️ Knowledge-graph context unavailable, continuing without it: {e}")
+        kg_context = ""
+    if kg_context:
+        print(f"🕸️ Found {kg_context.count(chr(10)) + 1} related knowledge-graph relations.")
+    return {"documents": documents, "kg_context": kg_context}
\ No newline at end of file
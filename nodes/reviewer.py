@@ -1,13 +1,17 @@
 # FILE: nodes/reviewer.py
 
 from typing import Dict, Any
-from utils.llm_api import query_huggingface_api
+from utils.candidates import map_candidates
+from utils.llm_api import generation_profile, query_huggingface_api
 
-def reviewer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("---NODE: REVIEWER---")
-    hypothesis = state.get("hypothesis")
-    analysis = state.get("analysis")
+# A single word is expected; low temperature keeps the verdict stable.
+REVIEW_PROFILE = generation_profile("reviewer", max_new_tokens=8, temperature=0.1)
 
+# Candidate fields copied to the top level of the state when a candidate is chosen.
+PROMOTED_FIELDS = ("experiment_plan", "code", "dockerfile", "results", "analysis")
+
+def review(hypothesis: str, analysis: str) -> str:
+    """Asks the LLM whether an analysis settles the hypothesis: 'proceed' or 'redesign'."""
     prompt = f"""
     You are a senior scientist reviewing a research experiment.
     **Hypothesis:** {hypothesis}
@@ -17,8 +21,7 @@ def reviewer_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Based on the analysis, are the results sufficient and clear enough to support or refute the hypothesis?
     Respond with only ONE of the following words: 'proceed' or 'redesign'.
     """
-    print("🧐 Reviewing analysis...")
-    decision = query_huggingface_api(prompt).strip().lower()
+    decision = query_huggingface_api(prompt, **REVIEW_PROFILE).strip().lower()
     
     # Clean up decision string
     if "proceed" in decision:
@@ -27,6 +30,29 @@ def reviewer_node(state: Dict[str, Any]) -> Dict[str, Any]:
         final_decision = "redesign"
     else:
         final_decision = "redesign" # Default to redesign if unclear
-        
+    return final_decision
+
+def reviewer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    print("---NODE: REVIEWER---")
+    hypothesis = state.get("hypothesis")
+    candidates = state.get("candidates") or []
+    if candidates:
+        # Only candidates whose experiment ran are worth a review.
+        reviewable = [i for i, candidate in enumerate(candidates) if "error" not in candidate.get("results", {})]
+        print(f"🧐 Reviewing {len(reviewable)} of {len(candidates)} candidates concurrently...")
+        decisions = dict(zip(reviewable, map_candidates(
+            lambda i: review(hypothesis, candidates[i]["analysis"]), reviewable)))
+        chosen = next((i for i in reviewable if decisions[i] == "proceed"), None)
+        final_decision = "redesign" if chosen is None else "proceed"
+        # The first candidate that settles the hypothesis wins; otherwise keep the first that ran.
+        if chosen is None:
+            chosen = reviewable[0] if reviewable else 0
+        print(f"✅ Reviewer decision: {final_decision} (candidate {chosen + 1} of {len(candidates)})")
+        update = {field: candidates[chosen][field] for field in PROMOTED_FIELDS if field in candidates[chosen]}
+        return {**update, "decision": final_decision}
+
+    analysis = state.get("analysis")
+    print("🧐 Reviewing analysis...")
+    final_decision = review(hypothesis, analysis)
     print(f"✅ Reviewer decision: {final_decision}")
     return {"decision": final_decision}
\ No newline at end of file
@@ -1,50 +1,37 @@
 # FILE: nodes/sandbox_runner.py
 
-import docker
-import os
-import uuid
-import json
 from typing import Dict, Any
+from utils.candidates import SANDBOX_CONCURRENCY, map_candidates
+from utils.sandbox import get_sandbox_backend
+
+def run_experiment(code: str, dockerfile: str) -> Dict[str, Any]:
+    """Runs one script in the sandbox; failures come back as {"error": ...} results."""
+    try:
+        return get_sandbox_backend().run(code, dockerfile)
+    except Exception as e:
+        print(f"❌ An error occurred in the sandbox: {e}")
+        return {"error": str(e)}
 
 def sandbox_runner_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("---NODE: SANDBOX RUNNER---")
-    code = state.get("code")
-    dockerfile = state.get("dockerfile")
-    
-    run_id = str(uuid.uuid4())
-    workspace_path = os.path.join("sandbox", run_id)
-    os.makedirs(workspace_path, exist_ok=True)
-    print(f"📦 Created temporary workspace: {workspace_path}")
-
-    results = {}
     try:
-        with open(os.path.join(workspace_path, "experiment.py"), "w") as f:
-            f.write(code)
-        with open(os.path.join(workspace_path, "Dockerfile"), "w") as f:
-            f.write(dockerfile)
-
-        client = docker.from_env()
-        image_tag = f"research-run-{run_id}"
-        print(f"🐳 Building Docker image: {image_tag}")
-        image, _ = client.images.build(path=workspace_path, tag=image_tag, rm=True)
-        print("✅ Docker image built.")
-
-        print(f"🚀 Running container...")
-        container = client.containers.run(image_tag, detach=False, remove=True)
-        print("✅ Container finished.")
+        get_sandbox_backend().collect_garbage()
+    except Exception as e:
+        # Leftover workspaces are not a reason to skip the experiment; run_experiment reports real failures.
+        print(f"⚠️ Could not clean up old sandbox workspaces: {e}")
 
-        results_path = os.path.join(workspace_path, "results.json")
-        if os.path.exists(results_path):
-            with open(results_path, "r") as f:
-                results = json.load(f)
-            print("📊 Results retrieved:")
-            print(json.dumps(results, indent=2))
-        else:
-            print("⚠️ No results.json file found.")
-            results = {"error": "results.json not found"}
+    candidates = state.get("candidates") or []
+    if candidates:
+        print(f"🧪 Running {len(candidates)} candidate experiments, {SANDBOX_CONCURRENCY} at a time...")
+        results = map_candidates(
+            lambda candidate: run_experiment(candidate["code"], candidate["dockerfile"]),
+            candidates,
+            max_workers=SANDBOX_CONCURRENCY,
+        )
+        candidates = [{**candidate, "results": result} for candidate, result in zip(candidates, results)]
+        succeeded = sum("error" not in result for result in results)
+        print(f"✅ {succeeded} of {len(candidates)} candidate experiments produced results.")
+        return {"results": results[0], "candidates": candidates}
 
-    except Exception as e:
-        print(f"❌ An error occurred in the sandbox: {e}")
-        results = {"error": str(e)}
-        
-    return {"results": results}
\ No newline at end of file
+    results = run_experiment(state.get("code"), state.get("dockerfile"))
+    return {"results": results}
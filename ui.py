@@ -5,7 +5,6 @@ from dotenv import load_dotenv
 import sys
 import os
 import pprint
-import shutil
 
 # This allows the script to find and import the 'graph' module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
@@ -14,22 +13,24 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 load_dotenv()
 
 # LangChain imports for the ingestion process
-from langchain_community.document_loaders import PyMuPDFLoader # More robust for single files
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from utils.ingestion import iter_split_files, embed_into_index
+from utils.vector_store import get_embeddings, save_vector_store
 
 # Import the compiled LangGraph app
 try:
-    from graph import app
+    from graph import get_app, new_run_id, run_config
+    from utils.background import drain_background_tasks
+    from utils.metrics import export_run, summarize
+    from utils.run_outputs import get_run_output_dir
 except ImportError:
     st.error("Failed to import the graph application. Ensure this script is in the project's root directory.")
     st.stop()
 
+app = get_app()
+
 # --- Constants and Directories ---
 PERSISTENT_CORPUS_PATH = "persistent_corpus"
 FAISS_INDEXES_PATH = "faiss_indexes" # Stores a permanent index for each PDF
-TEMP_FAISS_PATH = "faiss_index" # A temporary, merged index for the current run
 
 # Ensure directories exist
 os.makedirs(PERSISTENT_CORPUS_PATH, exist_ok=True)
@@ -46,56 +47,77 @@ def get_faiss_index_path(file_name):
 
 def process_selected_files(selected_files):
     """
-    Loads pre-built indexes for existing files and creates new ones for new files.
-    Merges them into a single temporary index for the current run.
+    Makes sure every selected file has its own pre-built index, creating indexes for new files.
+    Returns the index paths for the retriever to search directly, or None if nothing was indexed.
     """
     with st.spinner("Processing selected documents... This may take a moment."):
-        # 1. Clean up the temporary merged index from the last run
-        if os.path.exists(TEMP_FAISS_PATH):
-            shutil.rmtree(TEMP_FAISS_PATH)
-        
-        individual_indexes = []
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        index_paths = []
+        embeddings = get_embeddings()
 
+        # 1. Reuse pre-built indexes for files that already have one
+        missing_files = []
         for file_name in selected_files:
             index_path = get_faiss_index_path(file_name)
-            
-            # 2. If a pre-built index exists, load it
             if os.path.exists(index_path):
-                st.write(f"Loading pre-built index for {file_name}...")
-                db = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
-                individual_indexes.append(db)
-            
-            # 3. If not, create a new index and save it
+                index_paths.append(index_path)
             else:
-                st.write(f"Creating new index for {file_name}...")
-                file_path = os.path.join(PERSISTENT_CORPUS_PATH, file_name)
-                
-                loader = PyMuPDFLoader(file_path)
-                documents = loader.load()
-                
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-                docs = text_splitter.split_documents(documents)
-
-                db = FAISS.from_documents(docs, embeddings)
-                db.save_local(index_path) # Save the individual index permanently
-                individual_indexes.append(db)
+                missing_files.append(file_name)
+
+        # 2. Parse new files in parallel, embed them in batches and save each index
+        if missing_files:
+            st.write(f"Creating new indexes for {len(missing_files)} file(s)...")
+            paths = [os.path.join(PERSISTENT_CORPUS_PATH, file_name) for file_name in missing_files]
+            for file_path, chunks in iter_split_files(paths, loader="pymupdf"):
+                file_name = os.path.basename(file_path)
+                chunk_stream = ((text, metadata, f"{file_name}::{i}") for i, (text, metadata) in enumerate(chunks))
+                db = embed_into_index(None, embeddings, chunk_stream)
+                if db is None:
+                    st.write(f"No text could be extracted from {file_name}.")
+                    continue
+                index_path = get_faiss_index_path(file_name)
+                save_vector_store(db, index_path) # Save the individual index permanently
+                index_paths.append(index_path)
+                st.write(f"Indexed {file_name} ({len(chunks)} chunks).")
         
-        if not individual_indexes:
+        if not index_paths:
             st.error("No documents were processed.")
-            return False
+            return None
 
-        # 4. Merge all loaded/created indexes into one
-        st.write("Merging indexes for the current session...")
-        merged_db = individual_indexes[0]
-        for i in range(1, len(individual_indexes)):
-            merged_db.merge_from(individual_indexes[i])
-        
-        # 5. Save the final merged index to the temporary path that the agent uses
-        merged_db.save_local(TEMP_FAISS_PATH)
-        
+        # 3. The retriever searches the selected per-file indexes directly, so there is no merge step
         st.success("✅ Documents processed and ready for research!")
-        return True
+        return index_paths
+
+def run_research(inputs, run_id):
+    """Streams the graph for a run (inputs=None resumes it) and stores the final state."""
+    config = run_config(run_id)
+    st.info(f"Run ID: {run_id}. If the run fails, it can be resumed from the sidebar.")
+    with st.spinner("The agent is thinking..."):
+        try:
+            paper_placeholder = None
+            paper_text = ""
+            for mode, output in app.stream(inputs, config, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    # Render the paper progressively as its tokens arrive.
+                    if paper_placeholder is None:
+                        paper_placeholder = st.empty()
+                    paper_text += output.get("token", "")
+                    with paper_placeholder.container():
+                        st.subheader("Research Paper (generating...)")
+                        st.markdown(paper_text)
+                    continue
+                for key, value in output.items():
+                    with st.status(f"Executing Node: {key.replace('_', ' ').title()}", state="running", expanded=False) as status:
+                        status.update(label=f"Node '{key.replace('_', ' ').title()}' completed!", state="complete")
+            st.session_state.final_state = app.get_state(config).values
+            # The finished paper is rendered below with the final state; drop the streamed draft.
+            if paper_placeholder is not None:
+                paper_placeholder.empty()
+        except Exception as e:
+            st.error(f"An error occurred during the research process: {e}")
+    # Include the run's background knowledge-graph update in its timings and exported metrics.
+    drain_background_tasks(run_id=run_id)
+    st.session_state.timings = summarize(run_id)
+    export_run(run_id, get_run_output_dir(run_id))
 
 # --- Streamlit Page Configuration ---
 st.set_page_config(page_title="Autonomous Scientific Researcher", layout="wide")
@@ -105,6 +127,8 @@ st.title("🔬 Autonomous Scientific Researcher")
 # (The rest of the UI code remains largely the same)
 if "final_state" not in st.session_state:
     st.session_state.final_state = None
+if "timings" not in st.session_state:
+    st.session_state.timings = []
 
 with st.sidebar:
     st.header("1. Select & Upload Documents")
@@ -126,6 +150,10 @@ with st.sidebar:
     
     start_button = st.button("Start Research", type="primary", use_container_width=True)
 
+    st.header("3. Or Resume a Run")
+    resume_run_id = st.text_input("Run ID to resume:", "")
+    resume_button = st.button("Resume Run", use_container_width=True)
+
 if start_button:
     st.session_state.final_state = None
     
@@ -143,21 +171,23 @@ if start_button:
     elif not topic:
         st.warning("Please enter a research topic.")
     else:
-        ingestion_success = process_selected_files(selected_existing_files)
+        index_paths = process_selected_files(selected_existing_files)
         
-        if ingestion_success:
-            inputs = {"topic": topic, "loop_count": 0}
-            
-            with st.spinner("The agent is thinking..."):
-                try:
-                    for output in app.stream(inputs):
-                        for key, value in output.items():
-                            with st.status(f"Executing Node: {key.replace('_', ' ').title()}", state="running", expanded=False) as status:
-                                status.update(label=f"Node '{key.replace('_', ' ').title()}' completed!", state="complete")
-                        if "__end__" in output:
-                            st.session_state.final_state = output["__end__"]
-                except Exception as e:
-                    st.error(f"An error occurred during the research process: {e}")
+        if index_paths:
+            run_id = new_run_id()
+            inputs = {"run_id": run_id, "topic": topic, "index_paths": index_paths, "loop_count": 0}
+            run_research(inputs, run_id)
+
+elif resume_button:
+    st.session_state.final_state = None
+    snapshot = app.get_state(run_config(resume_run_id)) if resume_run_id else None
+
+    if not snapshot or not snapshot.values:
+        st.warning("No checkpoint was found for that run ID.")
+    elif not snapshot.next:
+        st.session_state.final_state = snapshot.values
+    else:
+        run_research(None, resume_run_id)
 
 if st.session_state.final_state:
     st.success("Research process completed successfully!")
@@ -166,4 +196,8 @@ if st.session_state.final_state:
     if "paper" in st.session_state.final_state and st.session_state.final_state["paper"]:
         st.markdown(st.session_state.final_state["paper"])
     else:
-        st.warning("The process finished, but no paper was generated.")
\ No newline at end of file
+        st.warning("The process finished, but no paper was generated.")
+
+if st.session_state.timings:
+    with st.expander("⏱️ Timing summary"):
+        st.dataframe(st.session_state.timings, use_container_width=True)
\ No newline at end of file
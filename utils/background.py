@@ -0,0 +1,56 @@
+# FILE: utils/background.py
+
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Callable, List, Optional, Tuple
+from utils.metrics import current_run_id, in_current_context, span
+
+# Work that nothing downstream in the graph waits on (e.g. knowledge-graph updates).
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "2"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+# (run ID, future) for work that may still be running.
+_pending: List[Tuple[str, Future]] = []
+_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="background")
+        return _executor
+
+def _log_failure(name: str, future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"❗️ Background task '{name}' failed: {future.exception()}")
+
+def _run_timed(name: str, fn: Callable, *args, **kwargs):
+    with span("background", name):
+        return fn(*args, **kwargs)
+
+def submit_background(name: str, fn: Callable, *args, **kwargs) -> Future:
+    """Queues fn to run off the critical path. Call drain_background_tasks() before exiting."""
+    future = _get_executor().submit(in_current_context(_run_timed), name, fn, *args, **kwargs)
+    future.add_done_callback(lambda f: _log_failure(name, f))
+    with _lock:
+        _pending[:] = [(run_id, f) for run_id, f in _pending if not f.done()]
+        _pending.append((current_run_id.get(), future))
+    return future
+
+def drain_background_tasks(timeout: Optional[float] = None, run_id: Optional[str] = None) -> bool:
+    """
+    Waits for queued background work, or only the work queued by run_id. Call it before
+    exporting a run's metrics so its background spans are included. Returns False if the
+    timeout expired first.
+    """
+    with _lock:
+        pending = [f for owner, f in _pending if not f.done() and (run_id is None or owner == run_id)]
+    if not pending:
+        return True
+    print(f"⏳ Waiting for {len(pending)} background task(s) to finish...")
+    _, not_done = wait(pending, timeout=timeout)
+    return not not_done
+
+atexit.register(drain_background_tasks)
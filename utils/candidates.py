@@ -0,0 +1,23 @@
+# FILE: utils/candidates.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+from utils.metrics import in_current_context
+
+# Experiment candidates designed, run and reviewed side by side per loop. 1 keeps the serial loop.
+NUM_CANDIDATES = int(os.getenv("NUM_CANDIDATES", "1"))
+# Upper bound on candidate experiments executing in the sandbox at once.
+SANDBOX_CONCURRENCY = int(os.getenv("SANDBOX_CONCURRENCY", "2"))
+
+def num_candidates(state: Dict[str, Any]) -> int:
+    """Candidates per loop for a run: the state's num_candidates, else NUM_CANDIDATES."""
+    return max(1, int(state.get("num_candidates") or NUM_CANDIDATES))
+
+def map_candidates(fn: Callable, items: List[Any], max_workers: int = 0) -> List[Any]:
+    """Applies fn to every item on worker threads (keeping the run's metrics context) and returns results in order."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    max_workers = max(1, min(max_workers or len(items), len(items)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="candidate") as executor:
+        return list(executor.map(in_current_context(fn), items))
@@ -0,0 +1,144 @@
+# FILE: utils/context_packing.py
+
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Optional
+from utils.ingestion import CHUNK_OVERLAP
+
+# Rough characters-per-token ratio used to size prompts without loading a tokenizer.
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "4"))
+# Token budgets for the context sections of each prompt.
+HYPOTHESIS_CONTEXT_TOKENS = int(os.getenv("HYPOTHESIS_CONTEXT_TOKENS", "1500"))
+KG_CONTEXT_TOKENS = int(os.getenv("KG_CONTEXT_TOKENS", "300"))
+KG_EXTRACTION_TOKENS = int(os.getenv("KG_EXTRACTION_TOKENS", "400"))
+# Chunks whose word shingles overlap at least this much with a kept chunk are dropped.
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# MMR trade-off: 1.0 ranks purely by relevance, 0.0 purely by diversity.
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Shortest shared suffix/prefix treated as splitter overlap rather than coincidence.
+MIN_OVERLAP_CHARS = 20
+SHINGLE_SIZE = 5
+
+_WORD = re.compile(r"\w+")
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _overlap_length(previous: str, text: str, max_chars: int) -> int:
+    """Length of the longest suffix of previous that text starts with."""
+    for length in range(min(len(previous), len(text), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:length]):
+            return length
+    return 0
+
+def strip_overlap(chunks: List[str], max_chars: int = 2 * CHUNK_OVERLAP) -> List[str]:
+    """Removes the leading text each chunk repeats from the end of an earlier one (splitter overlap)."""
+    kept = []
+    for chunk in chunks:
+        overlap = max((_overlap_length(previous, chunk, max_chars) for previous in kept), default=0)
+        remainder = chunk[overlap:].strip()
+        if remainder:
+            kept.append(remainder)
+    return kept
+
+def _shingles(text: str) -> set:
+    words = _words(text)
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def drop_near_duplicates(chunks: List[str], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[str]:
+    """Keeps the first of any group of chunks whose shingle containment reaches threshold."""
+    kept, kept_shingles = [], []
+    for chunk in chunks:
+        shingles = _shingles(chunk)
+        if not shingles:
+            continue
+        if any(len(shingles & other) / min(len(shingles), len(other)) >= threshold for other in kept_shingles):
+            continue
+        kept.append(chunk)
+        kept_shingles.append(shingles)
+    return kept
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[word] for word, count in a.items() if word in b)
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+def mmr_order(chunks: List[str], query: str, lambda_mult: float = MMR_LAMBDA) -> List[str]:
+    """
+    Orders chunks by maximal marginal relevance over term-frequency vectors, so each
+    pick is relevant to the query but unlike the chunks already picked.
+    """
+    vectors = [Counter(_words(chunk)) for chunk in chunks]
+    query_vector = Counter(_words(query))
+    # Retrieval order is the fallback relevance signal when the query shares no terms.
+    relevance = [_cosine(vector, query_vector) + 1e-3 * (len(chunks) - i) / max(len(chunks), 1)
+                 for i, vector in enumerate(vectors)]
+    remaining = list(range(len(chunks)))
+    selected: List[int] = []
+    while remaining:
+        def score(i):
+            redundancy = max((_cosine(vectors[i], vectors[j]) for j in selected), default=0.0)
+            return lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+        best = max(remaining, key=score)
+        selected.append(best)
+        remaining.remove(best)
+    return [chunks[i] for i in selected]
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cuts text to roughly budget tokens, at a word boundary where possible."""
+    max_chars = int(budget * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip() + " …"
+
+def fit_to_budget(chunks: List[str], budget: int, separator: str = "\n\n---\n\n",
+                  min_tail_tokens: int = 50) -> List[str]:
+    """Takes chunks in order until the budget is spent; the last one is truncated if enough room is left."""
+    packed, used = [], 0
+    separator_tokens = estimate_tokens(separator)
+    for chunk in chunks:
+        cost = estimate_tokens(chunk) + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(chunk)
+            used += cost
+            continue
+        room = budget - used - (separator_tokens if packed else 0)
+        if room >= min_tail_tokens:
+            packed.append(truncate_to_tokens(chunk, room))
+        break
+    return packed
+
+def pack_context(chunks: List[str], query: str, budget: int, separator: str = "\n\n---\n\n",
+                 lambda_mult: Optional[float] = MMR_LAMBDA) -> str:
+    """
+    Builds a prompt context from retrieved chunks: strips splitter overlap, drops
+    near-duplicates, orders by MMR (skipped when lambda_mult is None) and fits the
+    result into budget tokens.
+    """
+    chunks = drop_near_duplicates(strip_overlap([chunk for chunk in chunks if chunk and chunk.strip()]))
+    if lambda_mult is not None:
+        chunks = mmr_order(chunks, query, lambda_mult)
+    return separator.join(fit_to_budget(chunks, budget, separator))
+
+def pack_lines(text: str, budget: int) -> str:
+    """Keeps whole lines of a line-per-fact context (e.g. KG relations) until the budget is spent."""
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
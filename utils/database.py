@@ -1,19 +1,68 @@
 # FILE: utils/database.py
 
-import pymongo
-from pymongo import errors
 import os
+import threading
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+# How long the first connection attempt may block before MongoDB is treated as unavailable.
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
 
-try:
-    client = pymongo.MongoClient(MONGO_URI)
-    client.admin.command('ping')
-    print("✅ MongoDB connection successful.")
-    db = client["autonomous_researcher_db"]
-    knowledge_graph_collection = db["knowledge_graph"]
-except errors.ConnectionFailure as e:
-    print(f"❌ Could not connect to MongoDB: {e}")
-    db = None
-    knowledge_graph_collection = None
-    knowledge_graph_collection = None
\ No newline at end of file
+_db = None
+_connected = None
+_lock = threading.Lock()
+
+def ensure_knowledge_graph_indexes(collection) -> None:
+    """
+    One document per distinct normalized triple, plus lookups by either endpoint.
+    create_index is a no-op when the index already exists. Raw relations written by
+    older versions have no keys, so the unique index only covers normalized documents.
+    """
+    import pymongo
+    collection.create_index(
+        [("source_key", pymongo.ASCENDING), ("relation_key", pymongo.ASCENDING), ("target_key", pymongo.ASCENDING)],
+        unique=True,
+        partialFilterExpression={"source_key": {"$exists": True}},
+        name="triple_unique",
+    )
+    collection.create_index("source_key", name="source_key")
+    collection.create_index("target_key", name="target_key")
+
+def ensure_ledger_indexes(collection) -> None:
+    """The ledger is keyed by chunk hash (_id); this index serves invalidation sweeps."""
+    import pymongo
+    collection.create_index([("prompt_version", pymongo.ASCENDING), ("model", pymongo.ASCENDING)], name="prompt_model")
+
+def get_database():
+    """
+    Connects to MongoDB on first use and returns the database, or None if it is unreachable.
+    The outcome is remembered, so an unreachable server only costs one timeout per process.
+    """
+    global _db, _connected
+    if _connected is not None:
+        return _db
+    with _lock:
+        if _connected is None:
+            import pymongo
+            from pymongo import errors
+            try:
+                client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS)
+                client.admin.command('ping')
+                print("✅ MongoDB connection successful.")
+                db = client["autonomous_researcher_db"]
+                ensure_knowledge_graph_indexes(db["knowledge_graph"])
+                ensure_ledger_indexes(db["kg_extraction_ledger"])
+                _db = db
+            except errors.ConnectionFailure as e:
+                print(f"❌ Could not connect to MongoDB: {e}")
+                _db = None
+            _connected = _db is not None
+    return _db
+
+def get_knowledge_graph_collection():
+    db = get_database()
+    return db["knowledge_graph"] if db is not None else None
+
+def get_extraction_ledger_collection():
+    """Records which chunks have already been extracted, and with which prompt and model."""
+    db = get_database()
+    return db["kg_extraction_ledger"] if db is not None else None
@@ -0,0 +1,224 @@
+# FILE: utils/graph_index.py
+
+import threading
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+Triple = Tuple[str, str, str]
+
+# Longest entity name, in words, that find_entities will match in free text.
+MAX_ENTITY_WORDS = 6
+
+def normalize_entity(value) -> str:
+    """Collapses whitespace and case; must match how triples are keyed in MongoDB."""
+    return " ".join(str(value).split()).lower()
+
+class CSRSnapshot(NamedTuple):
+    """One immutable build of the CSR arrays. Queries capture a single snapshot, so a
+    concurrent rebuild can never pair new neighbor arrays with old offsets."""
+    out_offsets: array
+    out_targets: array
+    out_relations: array
+    in_offsets: array
+    in_sources: array
+    in_relations: array
+
+_EMPTY_SNAPSHOT = CSRSnapshot(array("l", [0]), array("l"), array("l"), array("l", [0]), array("l"), array("l"))
+
+class KnowledgeGraphIndex:
+    """
+    In-memory adjacency index over knowledge-graph triples.
+    Entities and relations are interned to integer IDs and edges are stored in
+    CSR form (an offsets array plus flat neighbor/relation arrays) in both
+    directions. New triples are buffered and the arrays rebuilt on the next query;
+    a rebuild publishes a new CSRSnapshot by swapping a single reference.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entity_ids: Dict[str, int] = {}
+        self._entity_names: List[str] = []
+        self._relation_ids: Dict[str, int] = {}
+        self._relation_names: List[str] = []
+        self._edges = set()
+        self._dirty = False
+        self._snapshot = _EMPTY_SNAPSHOT
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    @property
+    def entity_count(self) -> int:
+        return len(self._entity_names)
+
+    def _intern(self, ids: Dict[str, int], names: List[str], name: str) -> int:
+        key = normalize_entity(name)
+        index = ids.get(key)
+        if index is None:
+            index = len(names)
+            ids[key] = index
+            names.append(" ".join(str(name).split()))
+        return index
+
+    def add_triples(self, triples: Iterable[Triple]) -> int:
+        """Adds (source, relation, target) triples, ignoring ones already present. Returns the number added."""
+        added = 0
+        with self._lock:
+            for source, relation, target in triples:
+                if not normalize_entity(source) or not normalize_entity(relation) or not normalize_entity(target):
+                    continue
+                edge = (
+                    self._intern(self._entity_ids, self._entity_names, source),
+                    self._intern(self._relation_ids, self._relation_names, relation),
+                    self._intern(self._entity_ids, self._entity_names, target),
+                )
+                if edge not in self._edges:
+                    self._edges.add(edge)
+                    added += 1
+            if added:
+                self._dirty = True
+        return added
+
+    def _build_csr(self, edges: List[Tuple[int, int, int]], key: int, other: int):
+        count = len(self._entity_names)
+        degrees = [0] * (count + 1)
+        for edge in edges:
+            degrees[edge[key] + 1] += 1
+        for i in range(count):
+            degrees[i + 1] += degrees[i]
+        offsets = array("l", degrees)
+        neighbors = array("l", bytes(offsets.itemsize * len(edges)))
+        relations = array("l", bytes(offsets.itemsize * len(edges)))
+        cursor = list(degrees[:count])
+        for edge in edges:
+            slot = cursor[edge[key]]
+            neighbors[slot] = edge[other]
+            relations[slot] = edge[1]
+            cursor[edge[key]] += 1
+        return offsets, neighbors, relations
+
+    def _ensure_built(self) -> CSRSnapshot:
+        """Returns the current snapshot, rebuilding it first if triples were added."""
+        if not self._dirty:
+            return self._snapshot
+        with self._lock:
+            if self._dirty:
+                edges = list(self._edges)
+                self._snapshot = CSRSnapshot(*self._build_csr(edges, 0, 2), *self._build_csr(edges, 2, 0))
+                self._dirty = False
+            return self._snapshot
+
+    @staticmethod
+    def _adjacent(snapshot: CSRSnapshot, node: int):
+        """Yields (neighbor, relation, outgoing) for every edge touching node in snapshot."""
+        if node + 1 < len(snapshot.out_offsets):
+            for slot in range(snapshot.out_offsets[node], snapshot.out_offsets[node + 1]):
+                yield snapshot.out_targets[slot], snapshot.out_relations[slot], True
+        if node + 1 < len(snapshot.in_offsets):
+            for slot in range(snapshot.in_offsets[node], snapshot.in_offsets[node + 1]):
+                yield snapshot.in_sources[slot], snapshot.in_relations[slot], False
+
+    def _triple(self, node: int, neighbor: int, relation: int, outgoing: bool) -> Triple:
+        source, target = (node, neighbor) if outgoing else (neighbor, node)
+        return self._entity_names[source], self._relation_names[relation], self._entity_names[target]
+
+    def neighborhood(self, entities: Iterable[str], hops: int = 1, limit: int = 50) -> List[Triple]:
+        """Triples within `hops` edges (in either direction) of any of the entities, nearest first."""
+        snapshot = self._ensure_built()
+        start = [self._entity_ids[key] for key in map(normalize_entity, entities) if key in self._entity_ids]
+        seen_nodes = set(start)
+        seen_edges = set()
+        triples = []
+        frontier = deque((node, 0) for node in start)
+        while frontier and len(triples) < limit:
+            node, depth = frontier.popleft()
+            if depth >= hops:
+                continue
+            for neighbor, relation, outgoing in self._adjacent(snapshot, node):
+                triple = self._triple(node, neighbor, relation, outgoing)
+                if triple not in seen_edges:
+                    seen_edges.add(triple)
+                    triples.append(triple)
+                    if len(triples) >= limit:
+                        break
+                if neighbor not in seen_nodes:
+                    seen_nodes.add(neighbor)
+                    frontier.append((neighbor, depth + 1))
+        return triples
+
+    def shortest_path(self, source: str, target: str, max_hops: int = 6) -> Optional[List[Triple]]:
+        """The shortest chain of triples linking two entities (edges in either direction), or None."""
+        snapshot = self._ensure_built()
+        start = self._entity_ids.get(normalize_entity(source))
+        goal = self._entity_ids.get(normalize_entity(target))
+        if start is None or goal is None:
+            return None
+        if start == goal:
+            return []
+        parents = {start: None}
+        frontier = deque([(start, 0)])
+        while frontier:
+            node, depth = frontier.popleft()
+            if depth >= max_hops:
+                continue
+            for neighbor, relation, outgoing in self._adjacent(snapshot, node):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (node, relation, outgoing)
+                if neighbor == goal:
+                    path = []
+                    current = goal
+                    while parents[current] is not None:
+                        previous, rel, out = parents[current]
+                        path.append(self._triple(previous, current, rel, out))
+                        current = previous
+                    return list(reversed(path))
+                frontier.append((neighbor, depth + 1))
+        return None
+
+    def find_entities(self, text: str) -> List[str]:
+        """Known entities mentioned in free text, matched on whole-word n-grams."""
+        words = normalize_entity("".join(ch if ch.isalnum() or ch in "-_" else " " for ch in text)).split()
+        found = []
+        seen = set()
+        for size in range(min(MAX_ENTITY_WORDS, len(words)), 0, -1):
+            for i in range(len(words) - size + 1):
+                key = " ".join(words[i:i + size])
+                index = self._entity_ids.get(key)
+                if index is not None and index not in seen:
+                    seen.add(index)
+                    found.append(self._entity_names[index])
+        return found
+
+    def describe(self, text: str, hops: int = 1, limit: int = 20) -> str:
+        """A prompt-ready list of relations around the entities mentioned in text."""
+        triples = self.neighborhood(self.find_entities(text), hops=hops, limit=limit)
+        return "\n".join(f"- {source} --{relation}--> {target}" for source, relation, target in triples)
+
+_index: Optional[KnowledgeGraphIndex] = None
+_index_lock = threading.Lock()
+
+def get_graph_index() -> KnowledgeGraphIndex:
+    """Returns the process-wide index, loading every stored triple from MongoDB on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from utils.database import get_knowledge_graph_collection
+                knowledge_graph_collection = get_knowledge_graph_collection()
+                index = KnowledgeGraphIndex()
+                if knowledge_graph_collection is not None:
+                    cursor = knowledge_graph_collection.find(
+                        {"source_key": {"$exists": True}},
+                        {"_id": 0, "source_entity": 1, "relation": 1, "target_entity": 1},
+                    )
+                    index.add_triples((doc["source_entity"], doc["relation"], doc["target_entity"]) for doc in cursor)
+                    print(f"🕸️ Loaded {len(index)} knowledge-graph relations into memory.")
+                _index = index
+    return _index
+
+def record_triples(triples: Iterable[Triple]) -> None:
+    """Keeps an already-loaded index in step with new writes; unloaded indexes read them from MongoDB later."""
+    if _index is not None:
+        _index.add_triples(triples)
@@ -0,0 +1,85 @@
+# FILE: utils/ingestion.py
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+# Number of chunks handed to the embedding model at once.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Processes used to parse and split PDFs.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+Chunk = Tuple[str, Dict[str, Any]]
+
+def load_and_split(path: str, loader: str = "pypdf") -> List[Chunk]:
+    """Parses one PDF and splits it into (text, metadata) chunks. Runs in a worker process."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    if loader == "pymupdf":
+        from langchain_community.document_loaders import PyMuPDFLoader as Loader
+    else:
+        from langchain_community.document_loaders import PyPDFLoader as Loader
+
+    documents = Loader(path).load()
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    docs = text_splitter.split_documents(documents)
+    return [(doc.page_content, doc.metadata) for doc in docs]
+
+def iter_split_files(paths: List[str], loader: str = "pypdf",
+                     max_workers: int = INGEST_WORKERS) -> Iterator[Tuple[str, List[Chunk]]]:
+    """
+    Parses PDFs in a process pool and yields (path, chunks) as each file finishes.
+    At most two files per worker are in flight, which bounds memory on large corpora.
+    Workers are spawned rather than forked so they never inherit torch's threads.
+    """
+    if not paths:
+        return
+    max_workers = max(1, min(max_workers, len(paths)))
+    remaining = iter(paths)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        in_flight = {}
+        for path in remaining:
+            in_flight[executor.submit(load_and_split, path, loader)] = path
+            if len(in_flight) >= max_workers * 2:
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    in_flight[executor.submit(load_and_split, next_path, loader)] = next_path
+                yield path, future.result()
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_into_index(db, embeddings, chunks: Iterable[Tuple[str, Dict[str, Any], str]],
+                     batch_size: int = EMBED_BATCH_SIZE):
+    """
+    Embeds (text, metadata, id) chunks in fixed-size batches and adds each batch
+    to the FAISS store as soon as it is embedded. Creates the store if db is None.
+    Returns the (possibly new) store, or None if there were no chunks.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    for batch in _batched(chunks, max(1, batch_size)):
+        texts = [text for text, _, _ in batch]
+        metadatas = [metadata for _, metadata, _ in batch]
+        ids = [chunk_id for _, _, chunk_id in batch]
+        vectors = embeddings.embed_documents(texts)
+        text_embeddings = list(zip(texts, vectors))
+        if db is None:
+            db = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+        else:
+            db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    return db
@@ -1,45 +1,245 @@
 # FILE: utils/llm_api.py
 
 import os
-from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
-
-API_TOKEN = os.getenv("HUGGING_FACE_HUB_TOKEN")
-if not API_TOKEN:
-    raise ValueError("HUGGING_FACE_HUB_TOKEN environment variable not set!")
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from utils.disk_cache import DiskCache, content_hash
+from utils.metrics import increment, span
 
 # UPDATED: Switched back to a highly compatible and powerful model
 REPO_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
 
-def get_chat_model():
-    """Initializes and returns a ChatHuggingFace instance."""
-    llm = HuggingFaceEndpoint(
-        huggingfacehub_api_token=API_TOKEN,
-        repo_id=REPO_ID,
-        task="text-generation",
-        max_new_tokens=4096,
-        temperature=0.5,
-        repetition_penalty=1.2,
-    )
-    model = ChatHuggingFace(llm=llm)
+DEFAULT_GENERATION_KWARGS = {
+    "max_new_tokens": 4096,
+    "temperature": 0.5,
+    "repetition_penalty": 1.2,
+}
+
+# Named per-node generation settings, registered by generation_profile().
+GENERATION_PROFILES: Dict[str, Dict[str, Any]] = {}
+
+# On-disk response cache. Set LLM_CACHE_ENABLED=0 to always hit the endpoint.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Process-wide registry of chat clients, keyed by model and generation parameters.
+# Each client keeps its underlying inference session (and its pooled keep-alive
+# connections) for the lifetime of the process.
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_api_token() -> str:
+    """Reads the Hugging Face token when the first client is created, not at import time."""
+    api_token = os.getenv("HUGGING_FACE_HUB_TOKEN")
+    if not api_token:
+        raise ValueError("HUGGING_FACE_HUB_TOKEN environment variable not set!")
+    return api_token
+
+def _client_key(repo_id: str, generation_kwargs: dict) -> tuple:
+    # Stop sequences arrive as lists, which are not hashable.
+    items = ((name, tuple(value) if isinstance(value, list) else value) for name, value in generation_kwargs.items())
+    return (repo_id, tuple(sorted(items)))
+
+def generation_profile(name: str, repo_id: str = REPO_ID, max_new_tokens: int = 4096, temperature: float = 0.5,
+                       stop_sequences: Optional[List[str]] = None, **generation_kwargs) -> Dict[str, Any]:
+    """
+    Declares the model and generation settings one node needs, and returns them as keyword
+    arguments for the query functions: query_huggingface_api(prompt, **PROFILE).
+    LLM_MODEL_<NAME> and LLM_MAX_TOKENS_<NAME> override the model and token cap per profile.
+    """
+    env_name = name.upper()
+    profile = {
+        "repo_id": os.getenv(f"LLM_MODEL_{env_name}", repo_id),
+        **DEFAULT_GENERATION_KWARGS,
+        **generation_kwargs,
+        "max_new_tokens": int(os.getenv(f"LLM_MAX_TOKENS_{env_name}", str(max_new_tokens))),
+        "temperature": temperature,
+    }
+    if stop_sequences:
+        profile["stop_sequences"] = list(stop_sequences)
+    GENERATION_PROFILES[name] = profile
+    return profile
+
+def get_chat_model(repo_id: str = REPO_ID, **generation_kwargs):
+    """
+    Returns the shared ChatHuggingFace instance for a model/parameter set,
+    creating it on first use. Safe to call from threads and from asyncio tasks.
+    """
+    params = {**DEFAULT_GENERATION_KWARGS, **generation_kwargs}
+    key = _client_key(repo_id, params)
+    model = _CLIENTS.get(key)
+    if model is not None:
+        return model
+
+    with _CLIENTS_LOCK:
+        model = _CLIENTS.get(key)
+        if model is None:
+            from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
+            llm = HuggingFaceEndpoint(
+                huggingfacehub_api_token=get_api_token(),
+                repo_id=repo_id,
+                task="text-generation",
+                **params,
+            )
+            model = ChatHuggingFace(llm=llm)
+            _CLIENTS[key] = model
     return model
 
-def query_huggingface_api(prompt: str) -> str:
-    """Sends a prompt to the Hugging Face API using the LangChain wrapper."""
-    try:
-        chat_model = get_chat_model()
-        response_message = chat_model.invoke(prompt)
-        
-        if isinstance(response_message.content, list):
-            contents = []
-            for item in response_message.content:
-                if isinstance(item, str):
-                    contents.append(item)
-                elif isinstance(item, dict) and "text" in item:
-                    contents.append(item["text"])
-            return " ".join(contents).strip()
-        else:
-            return str(response_message.content).strip()
-            
-    except Exception as e:
-        print(f"❌ An error occurred during the API call: {e}")
-        raise
\ No newline at end of file
+def clear_chat_models():
+    """Drops every pooled client, e.g. after rotating the API token."""
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+def get_response_cache():
+    """Returns the shared LLM response cache, or None when caching is disabled."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(
+                    "llm_responses",
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                )
+    return _cache
+
+def cache_stats() -> dict:
+    """Hit/miss counters and size of the response cache."""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {"hits": 0, "misses": 0, "entries": 0, "bytes": 0}
+
+def _cache_key(prompt: str, repo_id: str, generation_kwargs: dict) -> str:
+    params = {**DEFAULT_GENERATION_KWARGS, **generation_kwargs}
+    return content_hash(repo_id, params, prompt)
+
+def evict_cached_response(prompt: str, repo_id: str = REPO_ID, **generation_kwargs) -> None:
+    """Drops a cached response, e.g. one its caller found unusable, so the next query is fresh."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.delete(_cache_key(prompt, repo_id, generation_kwargs))
+
+def _record_call(record: dict, text: str, cache_hit: bool) -> None:
+    """Adds completion size and cache outcome to an LLM span and the run's counters."""
+    record["completion_chars"] = len(text)
+    record["cache_hit"] = cache_hit
+    increment("llm_calls")
+    increment("llm_cache_hits" if cache_hit else "llm_cache_misses")
+    increment("llm_prompt_chars", record["prompt_chars"])
+    increment("llm_completion_chars", len(text))
+
+def _content_text(content) -> str:
+    """Flattens message (or message chunk) content into unstripped text."""
+    if isinstance(content, list):
+        contents = []
+        for item in content:
+            if isinstance(item, str):
+                contents.append(item)
+            elif isinstance(item, dict) and "text" in item:
+                contents.append(item["text"])
+        return " ".join(contents)
+    return str(content)
+
+def _message_text(response_message) -> str:
+    """Flattens a chat response message into plain text."""
+    return _content_text(response_message.content).strip()
+
+def _generate(prompt: str, repo_id: str, generation_kwargs: dict) -> str:
+    """Runs a single completion against the pooled client for the given settings."""
+    chat_model = get_chat_model(repo_id, **generation_kwargs)
+    return _message_text(chat_model.invoke(prompt))
+
+async def _agenerate(prompt: str, repo_id: str, generation_kwargs: dict) -> str:
+    chat_model = get_chat_model(repo_id, **generation_kwargs)
+    return _message_text(await chat_model.ainvoke(prompt))
+
+def _stream(prompt: str, repo_id: str, generation_kwargs: dict) -> Iterator[str]:
+    """Yields completion text from the pooled client as tokens arrive."""
+    chat_model = get_chat_model(repo_id, **generation_kwargs)
+    for chunk in chat_model.stream(prompt):
+        text = _content_text(chunk.content)
+        if text:
+            yield text
+
+def query_huggingface_api(prompt: str, repo_id: str = REPO_ID, use_cache: bool = True, **generation_kwargs) -> str:
+    """
+    Sends a prompt to the Hugging Face API using the LangChain wrapper.
+    Responses are served from the on-disk cache when possible; pass
+    use_cache=False when a fresh sample is required.
+    """
+    with span("llm", repo_id, prompt_chars=len(prompt)) as record:
+        cache = get_response_cache() if use_cache else None
+        key = _cache_key(prompt, repo_id, generation_kwargs) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                _record_call(record, cached, cache_hit=True)
+                return cached
+        try:
+            text = _generate(prompt, repo_id, generation_kwargs)
+        except Exception as e:
+            print(f"❌ An error occurred during the API call: {e}")
+            raise
+        if cache is not None and text:
+            cache.set(key, text)
+        _record_call(record, text, cache_hit=False)
+        return text
+
+async def aquery_huggingface_api(prompt: str, repo_id: str = REPO_ID, use_cache: bool = True, **generation_kwargs) -> str:
+    """Async counterpart of query_huggingface_api, sharing the same pooled clients and cache."""
+    with span("llm", repo_id, prompt_chars=len(prompt)) as record:
+        cache = get_response_cache() if use_cache else None
+        key = _cache_key(prompt, repo_id, generation_kwargs) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                _record_call(record, cached, cache_hit=True)
+                return cached
+        try:
+            text = await _agenerate(prompt, repo_id, generation_kwargs)
+        except Exception as e:
+            print(f"❌ An error occurred during the API call: {e}")
+            raise
+        if cache is not None and text:
+            cache.set(key, text)
+        _record_call(record, text, cache_hit=False)
+        return text
+
+def stream_huggingface_api(prompt: str, repo_id: str = REPO_ID, use_cache: bool = True, **generation_kwargs) -> Iterator[str]:
+    """
+    Streaming counterpart of query_huggingface_api: yields text chunks as the endpoint
+    produces them. A cached response is yielded as a single chunk; the full text is
+    cached once the stream completes.
+    """
+    with span("llm", repo_id, prompt_chars=len(prompt), streamed=True) as record:
+        cache = get_response_cache() if use_cache else None
+        key = _cache_key(prompt, repo_id, generation_kwargs) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                _record_call(record, cached, cache_hit=True)
+                yield cached
+                return
+        chunks = []
+        start = time.perf_counter()
+        try:
+            for chunk in _stream(prompt, repo_id, generation_kwargs):
+                if not chunks:
+                    record["first_token_s"] = time.perf_counter() - start
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"❌ An error occurred during the API call: {e}")
+            raise
+        text = "".join(chunks).strip()
+        if cache is not None and text:
+            cache.set(key, text)
+        _record_call(record, text, cache_hit=False)
@@ -0,0 +1,182 @@
+# FILE: utils/metrics.py
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# The run that work on the current thread/task belongs to. Set by instrument_node.
+current_run_id: contextvars.ContextVar[str] = contextvars.ContextVar("current_run_id", default="")
+
+class RunMetrics:
+    """Timed spans and counters collected for one research run."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add_span(self, span: Dict[str, Any]) -> None:
+        with self.lock:
+            self.spans.append(span)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+_runs: Dict[str, RunMetrics] = {}
+_runs_lock = threading.Lock()
+# Runs whose metrics were exported and discarded; late spans and counters for them are dropped
+# instead of recreating an entry that would never be exported or freed.
+_discarded: "OrderedDict[str, None]" = OrderedDict()
+MAX_DISCARDED_RUNS = 10000
+
+def _recording_metrics() -> Optional[RunMetrics]:
+    run_id = current_run_id.get()
+    if run_id in _discarded:
+        return None
+    return get_run_metrics(run_id)
+
+def get_run_metrics(run_id: Optional[str] = None) -> RunMetrics:
+    run_id = current_run_id.get() if run_id is None else run_id
+    metrics = _runs.get(run_id)
+    if metrics is None:
+        with _runs_lock:
+            metrics = _runs.setdefault(run_id, RunMetrics(run_id))
+    return metrics
+
+def increment(name: str, value: float = 1) -> None:
+    """Adds to a counter of the current run."""
+    metrics = _recording_metrics()
+    if metrics is not None:
+        metrics.increment(name, value)
+
+@contextmanager
+def span(kind: str, name: str, **attributes):
+    """
+    Times a block and records it on the current run. The yielded dict can be
+    filled with attributes (sizes, cache hits, ...) that are only known at the end.
+    """
+    record = {"kind": kind, "name": name, "thread": threading.current_thread().name, **attributes}
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["start"] = start_wall
+        record["duration_s"] = time.perf_counter() - start
+        metrics = _recording_metrics()
+        if metrics is not None:
+            metrics.add_span(record)
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """Wraps a graph node so its wall time is recorded against the run in its state."""
+    @functools.wraps(fn)
+    def wrapper(state):
+        run_id = state.get("run_id", "") or current_run_id.get()
+        # A resumed run is a new attempt: record it even if an earlier attempt was exported.
+        if run_id in _discarded:
+            with _runs_lock:
+                _discarded.pop(run_id, None)
+        token = current_run_id.set(run_id)
+        try:
+            with span("node", name):
+                return fn(state)
+        finally:
+            current_run_id.reset(token)
+    return wrapper
+
+def in_current_context(fn: Callable) -> Callable:
+    """Binds fn to a copy of the caller's context, so work handed to other threads keeps its run ID."""
+    context = contextvars.copy_context()
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+def summarize(run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-(kind, name) call counts and total/max wall time, slowest first."""
+    metrics = get_run_metrics(run_id)
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    with metrics.lock:
+        spans = list(metrics.spans)
+    for record in spans:
+        key = (record["kind"], record["name"])
+        row = totals.setdefault(key, {"kind": key[0], "name": key[1], "calls": 0, "total_s": 0.0, "max_s": 0.0})
+        row["calls"] += 1
+        row["total_s"] += record["duration_s"]
+        row["max_s"] = max(row["max_s"], record["duration_s"])
+    return sorted(totals.values(), key=lambda row: -row["total_s"])
+
+def format_summary(run_id: Optional[str] = None) -> str:
+    metrics = get_run_metrics(run_id)
+    lines = [f"{'kind':<10} {'name':<28} {'calls':>5} {'total s':>9} {'max s':>8}"]
+    for row in summarize(run_id):
+        lines.append(f"{row['kind']:<10} {row['name']:<28} {row['calls']:>5} {row['total_s']:>9.2f} {row['max_s']:>8.2f}")
+    for name, value in sorted(metrics.counters.items()):
+        lines.append(f"{name}: {value:g}")
+    return "\n".join(lines)
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+def prometheus_text(run_id: Optional[str] = None) -> str:
+    """Renders a run's metrics in the Prometheus text exposition format."""
+    metrics = get_run_metrics(run_id)
+    run = _label(metrics.run_id)
+    lines = [
+        "# HELP research_span_seconds Wall time spent in nodes, LLM calls, sandbox phases and retrieval.",
+        "# TYPE research_span_seconds summary",
+    ]
+    for row in summarize(run_id):
+        labels = f'run_id="{run}",kind="{_label(row["kind"])}",name="{_label(row["name"])}"'
+        lines.append(f"research_span_seconds_sum{{{labels}}} {row['total_s']:.6f}")
+        lines.append(f"research_span_seconds_count{{{labels}}} {row['calls']}")
+    for name, value in sorted(metrics.counters.items()):
+        metric = "research_" + "".join(ch if ch.isalnum() else "_" for ch in name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f'{metric}{{run_id="{run}"}} {value:g}')
+    return "\n".join(lines) + "\n"
+
+def export_run(run_id: str, directory: str, discard: bool = True) -> Dict[str, str]:
+    """
+    Writes trace.json and metrics.prom for a run into directory and returns their paths.
+    Later attempts of the same run (e.g. after a resume) get trace.2.json, metrics.2.prom, ...
+    so earlier attempts are never overwritten.
+    """
+    metrics = get_run_metrics(run_id)
+    os.makedirs(directory, exist_ok=True)
+    attempt = 1
+    while os.path.exists(os.path.join(directory, "trace.json" if attempt == 1 else f"trace.{attempt}.json")):
+        attempt += 1
+    suffix = "" if attempt == 1 else f".{attempt}"
+    trace_path = os.path.join(directory, f"trace{suffix}.json")
+    prom_path = os.path.join(directory, f"metrics{suffix}.prom")
+    with metrics.lock:
+        trace = {
+            "run_id": run_id,
+            "started_at": metrics.started_at,
+            "counters": dict(metrics.counters),
+            "spans": sorted(metrics.spans, key=lambda record: record["start"]),
+        }
+    with open(trace_path, "w") as f:
+        json.dump(trace, f, indent=2, default=str)
+    with open(prom_path, "w") as f:
+        f.write(prometheus_text(run_id))
+    if discard:
+        with _runs_lock:
+            _runs.pop(run_id, None)
+            _discarded[run_id] = None
+            while len(_discarded) > MAX_DISCARDED_RUNS:
+                _discarded.popitem(last=False)
+    return {"trace": trace_path, "prometheus": prom_path}
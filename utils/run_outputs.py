@@ -0,0 +1,11 @@
+# FILE: utils/run_outputs.py
+
+import os
+
+OUTPUTS_DIR = "outputs"
+
+def get_run_output_dir(run_id: str = "") -> str:
+    """Returns (and creates) the directory a run writes its artifacts to."""
+    path = os.path.join(OUTPUTS_DIR, run_id) if run_id else OUTPUTS_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
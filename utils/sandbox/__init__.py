@@ -0,0 +1,165 @@
+# FILE: utils/sandbox/__init__.py
+
+import ast
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+from utils.disk_cache import DiskCache, content_hash
+from utils.metrics import increment, span
+
+SANDBOX_ROOT = "sandbox"
+# Which backend runs experiments: "docker" (default) or "local" for machines without a Docker daemon.
+SANDBOX_BACKEND = os.getenv("SANDBOX_BACKEND", "docker")
+SANDBOX_TIMEOUT_SECONDS = int(os.getenv("SANDBOX_TIMEOUT_SECONDS", "600"))
+# Workspaces older than this, or beyond the newest SANDBOX_MAX_WORKSPACES, are deleted.
+SANDBOX_RETENTION_SECONDS = int(os.getenv("SANDBOX_RETENTION_SECONDS", str(24 * 3600)))
+SANDBOX_MAX_WORKSPACES = int(os.getenv("SANDBOX_MAX_WORKSPACES", "50"))
+
+# Results of successful experiments, keyed by normalized code and environment. Set SANDBOX_CACHE_ENABLED=0 to always rerun.
+SANDBOX_CACHE_ENABLED = os.getenv("SANDBOX_CACHE_ENABLED", "1") != "0"
+SANDBOX_CACHE_MAX_ENTRIES = int(os.getenv("SANDBOX_CACHE_MAX_ENTRIES", "5000"))
+SANDBOX_CACHE_MAX_MB = int(os.getenv("SANDBOX_CACHE_MAX_MB", "64"))
+
+# Exit status reported when an experiment is killed for running too long (matches coreutils `timeout`).
+TIMEOUT_EXIT_CODE = 124
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> Optional[DiskCache]:
+    """Returns the shared experiment result cache, or None when caching is disabled."""
+    global _result_cache
+    if not SANDBOX_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = DiskCache(
+                    "sandbox_results",
+                    max_entries=SANDBOX_CACHE_MAX_ENTRIES,
+                    max_bytes=SANDBOX_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _result_cache
+
+def normalized_code_hash(code: str) -> str:
+    """Hashes code by its syntax tree, so comments, blank lines and formatting don't matter."""
+    try:
+        normalized = ast.dump(ast.parse(code))
+    except SyntaxError:
+        normalized = "\n".join(line.rstrip() for line in code.strip().splitlines())
+    return content_hash(normalized)
+
+class SandboxBackend:
+    """
+    Runs experiment.py in a per-run workspace and collects the results.json it writes.
+    Subclasses implement _execute; workspace handling and result collection are shared.
+    """
+
+    name = "base"
+
+    def _execute(self, run_id: str, workspace_path: str) -> Tuple[int, str]:
+        """Runs experiment.py inside the workspace and returns (exit code, combined output)."""
+        raise NotImplementedError
+
+    def environment_key(self) -> str:
+        """Identifies the interpreter and packages experiments run against; part of the result cache key."""
+        return self.name
+
+    def run(self, code: str, dockerfile: str = "") -> Dict[str, Any]:
+        cache = get_result_cache()
+        key = content_hash(normalized_code_hash(code), self.environment_key()) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                entry = json.loads(cached)
+                increment("sandbox_cache_hits")
+                print("♻️ Identical experiment already ran in this environment; reusing its results.")
+                if entry["output"]:
+                    print(entry["output"])
+                print("📊 Results retrieved:")
+                print(json.dumps(entry["results"], indent=2))
+                return entry["results"]
+            increment("sandbox_cache_misses")
+
+        results, exit_code, output = self._run_in_workspace(code, dockerfile)
+        # Only clean runs are stored: errors, timeouts and missing results are always retried.
+        if cache is not None and exit_code == 0 and "error" not in results:
+            cache.set(key, json.dumps({"results": results, "output": output}))
+        return results
+
+    def _run_in_workspace(self, code: str, dockerfile: str) -> Tuple[Dict[str, Any], int, str]:
+        run_id = str(uuid.uuid4())
+        workspace_path = os.path.join(SANDBOX_ROOT, run_id)
+        os.makedirs(workspace_path, exist_ok=True)
+        print(f"📦 Created temporary workspace: {workspace_path}")
+
+        with open(os.path.join(workspace_path, "experiment.py"), "w") as f:
+            f.write(code)
+        if dockerfile:
+            # Kept for reference only; backends provide their own environment.
+            with open(os.path.join(workspace_path, "Dockerfile"), "w") as f:
+                f.write(dockerfile)
+
+        print(f"🚀 Running experiment with the {self.name} sandbox...")
+        with span("sandbox", f"{self.name}.run") as record:
+            exit_code, output = self._execute(run_id, workspace_path)
+            record["exit_code"] = exit_code
+        print("✅ Experiment finished.")
+        if output:
+            print(output)
+
+        if exit_code == TIMEOUT_EXIT_CODE:
+            return {"error": f"experiment timed out after {SANDBOX_TIMEOUT_SECONDS} seconds"}, exit_code, output
+
+        results_path = os.path.join(workspace_path, "results.json")
+        if os.path.exists(results_path):
+            with open(results_path, "r") as f:
+                results = json.load(f)
+            print("📊 Results retrieved:")
+            print(json.dumps(results, indent=2))
+            return results, exit_code, output
+
+        print("⚠️ No results.json file found.")
+        if exit_code != 0:
+            return {"error": f"experiment exited with status {exit_code}: {output[-2000:]}"}, exit_code, output
+        return {"error": "results.json not found"}, exit_code, output
+
+    def collect_garbage(self) -> None:
+        """Applies the retention policy to old workspaces."""
+        if not os.path.isdir(SANDBOX_ROOT):
+            return
+        workspaces = [os.path.join(SANDBOX_ROOT, name) for name in os.listdir(SANDBOX_ROOT)]
+        workspaces = sorted((p for p in workspaces if os.path.isdir(p)), key=os.path.getmtime, reverse=True)
+        cutoff = time.time() - SANDBOX_RETENTION_SECONDS
+        for index, path in enumerate(workspaces):
+            if index >= SANDBOX_MAX_WORKSPACES or os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_sandbox_backend() -> SandboxBackend:
+    """Returns the process-wide backend selected by SANDBOX_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if SANDBOX_BACKEND == "local":
+                    from utils.sandbox.local_backend import LocalSandboxBackend
+                    _backend = LocalSandboxBackend()
+                elif SANDBOX_BACKEND == "docker":
+                    from utils.sandbox.docker_backend import DockerSandboxBackend
+                    _backend = DockerSandboxBackend()
+                else:
+                    raise ValueError(f"Unknown SANDBOX_BACKEND '{SANDBOX_BACKEND}'. Use 'docker' or 'local'.")
+    return _backend
+
+def set_sandbox_backend(backend: SandboxBackend) -> None:
+    """Replaces the process-wide backend, e.g. with a stand-in for offline runs."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
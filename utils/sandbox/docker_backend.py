@@ -0,0 +1,185 @@
+# FILE: utils/sandbox/docker_backend.py
+
+import atexit
+import io
+import os
+import queue
+import tarfile
+import threading
+from typing import Optional, Tuple
+from utils.disk_cache import content_hash
+from utils.metrics import span
+from utils.sandbox import SANDBOX_TIMEOUT_SECONDS, SandboxBackend
+
+SANDBOX_PACKAGES = ["pandas", "scikit-learn", "numpy"]
+BASE_DOCKERFILE = f"""
+FROM python:3.9-slim
+WORKDIR /app
+RUN pip install --no-cache-dir {' '.join(SANDBOX_PACKAGES)}
+"""
+# Tagged by the Dockerfile hash, so changing the dependencies builds a new base image once.
+BASE_IMAGE_TAG = f"research-sandbox-base:{content_hash(BASE_DOCKERFILE)[:12]}"
+
+# Idle containers kept running so experiments skip container startup. 0 disables the pool.
+SANDBOX_POOL_SIZE = int(os.getenv("SANDBOX_POOL_SIZE", "0"))
+
+_client = None
+_base_image_ready = False
+_lock = threading.Lock()
+
+def get_docker_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import docker
+                _client = docker.from_env()
+    return _client
+
+def ensure_base_image() -> str:
+    """Builds the shared dependency image the first time it is needed and returns its tag."""
+    global _base_image_ready
+    if _base_image_ready:
+        return BASE_IMAGE_TAG
+    from docker.errors import ImageNotFound
+    client = get_docker_client()
+    with _lock:
+        if not _base_image_ready:
+            try:
+                client.images.get(BASE_IMAGE_TAG)
+            except ImageNotFound:
+                print(f"🐳 Building base sandbox image: {BASE_IMAGE_TAG}")
+                with span("sandbox", "docker.build"):
+                    client.images.build(fileobj=io.BytesIO(BASE_DOCKERFILE.encode("utf-8")), tag=BASE_IMAGE_TAG, rm=True)
+                print("✅ Base sandbox image built.")
+            _base_image_ready = True
+    return BASE_IMAGE_TAG
+
+class ContainerPool:
+    """
+    Keeps pre-started idle containers so experiments skip container startup. Each container
+    serves exactly one experiment: its workspace is copied in, results are copied out, and
+    the container is removed, so no files or processes carry over between experiments.
+    Used containers are replaced in the background.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.Queue()
+        self._refill_lock = threading.Lock()
+
+    def _start(self):
+        client = get_docker_client()
+        # No host mounts: the container only ever sees the workspace copied into it.
+        return client.containers.run(
+            ensure_base_image(),
+            ["sleep", "infinity"],
+            detach=True,
+            working_dir="/app",
+            labels={"research-sandbox": "pool"},
+        )
+
+    def fill(self) -> None:
+        with self._refill_lock:
+            while self._idle.qsize() < self.size:
+                self._idle.put(self._start())
+
+    def refill_in_background(self) -> None:
+        threading.Thread(target=self.fill, name="sandbox-pool-fill", daemon=True).start()
+
+    def acquire(self):
+        try:
+            container = self._idle.get_nowait()
+        except queue.Empty:
+            container = self._start()
+        self.refill_in_background()
+        return container
+
+    def discard(self, container) -> None:
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            print(f"⚠️ Could not remove sandbox container: {e}")
+
+    def shutdown(self) -> None:
+        while not self._idle.empty():
+            try:
+                self._idle.get_nowait().remove(force=True)
+            except Exception:
+                pass
+
+def _workspace_archive(workspace_path: str) -> bytes:
+    """Tars the workspace's files so they can be copied into a container's /app."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        for name in os.listdir(workspace_path):
+            archive.add(os.path.join(workspace_path, name), arcname=name)
+    return buffer.getvalue()
+
+def _copy_out(container, path: str, workspace_path: str) -> None:
+    """Copies one file from the container into the workspace, if the experiment wrote it."""
+    from docker.errors import NotFound
+    try:
+        chunks, _ = container.get_archive(path)
+    except NotFound:
+        return
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks)), mode="r") as archive:
+        member = archive.getmembers()[0]
+        if not member.isfile():
+            return
+        with open(os.path.join(workspace_path, os.path.basename(path)), "wb") as f:
+            f.write(archive.extractfile(member).read())
+
+class DockerSandboxBackend(SandboxBackend):
+    """Runs experiments in containers from a prebuilt base image, optionally from a warm pool."""
+
+    name = "docker"
+
+    def __init__(self, pool_size: int = SANDBOX_POOL_SIZE):
+        self._pool: Optional[ContainerPool] = None
+        if pool_size > 0:
+            self._pool = ContainerPool(pool_size)
+            atexit.register(self._pool.shutdown)
+            # Warm the pool without holding up the experiment that created the backend.
+            self._pool.refill_in_background()
+
+    def environment_key(self) -> str:
+        return f"docker:{BASE_IMAGE_TAG}"
+
+    def _execute(self, run_id: str, workspace_path: str) -> Tuple[int, str]:
+        command = ["timeout", str(SANDBOX_TIMEOUT_SECONDS), "python", "experiment.py"]
+        if self._pool is not None:
+            container = self._pool.acquire()
+            try:
+                container.put_archive("/app", _workspace_archive(workspace_path))
+                exit_code, output = container.exec_run(command, workdir="/app")
+                _copy_out(container, "/app/results.json", workspace_path)
+            finally:
+                self._pool.discard(container)
+            return exit_code, output.decode("utf-8", errors="replace")
+
+        client = get_docker_client()
+        container = client.containers.run(
+            ensure_base_image(),
+            command,
+            detach=True,
+            working_dir="/app",
+            volumes={os.path.abspath(workspace_path): {"bind": "/app", "mode": "rw"}},
+            labels={"research-sandbox": "run"},
+        )
+        try:
+            exit_code = container.wait()["StatusCode"]
+            output = container.logs().decode("utf-8", errors="replace")
+        finally:
+            container.remove(force=True)
+        return exit_code, output
+
+    def collect_garbage(self) -> None:
+        """Prunes old workspaces and removes the per-run images left by older versions."""
+        super().collect_garbage()
+        try:
+            client = get_docker_client()
+            for image in client.images.list(filters={"reference": "research-run-*"}):
+                client.images.remove(image.id, force=True)
+        except Exception as e:
+            print(f"⚠️ Could not clean up old sandbox images: {e}")
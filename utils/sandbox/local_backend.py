@@ -0,0 +1,123 @@
+# FILE: utils/sandbox/local_backend.py
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+from utils.sandbox import SANDBOX_TIMEOUT_SECONDS, TIMEOUT_EXIT_CODE, SandboxBackend
+
+# Warm interpreters kept alive with the experiment libraries already imported.
+SANDBOX_LOCAL_WORKERS = int(os.getenv("SANDBOX_LOCAL_WORKERS", "2"))
+# Address-space limit applied to each experiment process.
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))
+# Largest file an experiment may write.
+SANDBOX_MAX_FILE_MB = int(os.getenv("SANDBOX_MAX_FILE_MB", "256"))
+
+WARM_MODULES = ["numpy", "pandas", "sklearn"]
+# Distributions whose versions identify the environment in the result cache key.
+ENVIRONMENT_PACKAGES = ["numpy", "pandas", "scikit-learn"]
+
+def _warm_up() -> None:
+    """Worker initializer: imports the heavy libraries once so every experiment starts warm."""
+    for module in WARM_MODULES:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+def _run_forked(workspace_path: str, timeout: int, memory_mb: int, max_file_mb: int) -> Tuple[int, str]:
+    """
+    Runs in a warm worker. Forks a child that inherits the imported libraries, confines it
+    to the workspace under CPU, memory and file-size rlimits, and runs experiment.py there.
+    """
+    import resource
+    import runpy
+
+    log_path = os.path.join(workspace_path, "output.log")
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.chdir(workspace_path)
+            log_fd = os.open("output.log", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.dup2(log_fd, 1)
+            os.dup2(log_fd, 2)
+            resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+            memory_bytes = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            file_bytes = max_file_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+            sys.argv = ["experiment.py"]
+            runpy.run_path("experiment.py", run_name="__main__")
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        waited_pid, status = os.waitpid(pid, os.WNOHANG)
+        if waited_pid:
+            break
+        if time.monotonic() > deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return TIMEOUT_EXIT_CODE, _read_log(log_path)
+        time.sleep(0.05)
+
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        # Exceeding RLIMIT_CPU delivers SIGXCPU, which is the CPU-time form of a timeout.
+        exit_code = TIMEOUT_EXIT_CODE if signum == signal.SIGXCPU else 128 + signum
+    else:
+        exit_code = os.WEXITSTATUS(status)
+    return exit_code, _read_log(log_path)
+
+def _read_log(log_path: str) -> str:
+    if not os.path.exists(log_path):
+        return ""
+    with open(log_path, "r", errors="replace") as f:
+        return f.read()
+
+class LocalSandboxBackend(SandboxBackend):
+    """
+    Runs experiments in warm local Python workers instead of containers. Intended for
+    development and CI machines without Docker: it limits resources but is not a security boundary.
+    """
+
+    name = "local"
+
+    def __init__(self, workers: int = SANDBOX_LOCAL_WORKERS):
+        if os.name != "posix":
+            raise RuntimeError("The local sandbox backend requires a POSIX system.")
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+
+    def environment_key(self) -> str:
+        from importlib.metadata import PackageNotFoundError, version
+        versions = []
+        for package in ENVIRONMENT_PACKAGES:
+            try:
+                versions.append(f"{package}=={version(package)}")
+            except PackageNotFoundError:
+                versions.append(f"{package}==missing")
+        return f"local:{sys.version.split()[0]}:{','.join(versions)}:{SANDBOX_MEMORY_MB}MB"
+
+    def _execute(self, run_id: str, workspace_path: str) -> Tuple[int, str]:
+        future = self._executor.submit(
+            _run_forked, os.path.abspath(workspace_path), SANDBOX_TIMEOUT_SECONDS,
+            SANDBOX_MEMORY_MB, SANDBOX_MAX_FILE_MB,
+        )
+        return future.result()
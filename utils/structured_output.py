@@ -0,0 +1,128 @@
+# FILE: utils/structured_output.py
+
+import ast
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+from utils.llm_api import evict_cached_response, query_huggingface_api
+from utils.metrics import increment
+
+# Repair attempts allowed per structured call before giving up.
+STRUCTURED_OUTPUT_RETRIES = int(os.getenv("STRUCTURED_OUTPUT_RETRIES", "2"))
+# Longest stretch of bad output quoted back to the model in a repair prompt.
+REPAIR_MAX_CHARS = 6000
+
+REPAIR_TEMPLATE = """
+    The text below was supposed to be {expected}, but it could not be used: {error}
+
+    Text:
+    ---
+    {output}
+    ---
+    Return only the corrected JSON, with no explanation and no code fence.
+    """
+
+_FENCED = re.compile(r"```(?:json)?\s*\n(.*?)\n?```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float), "boolean": bool}
+
+class StructuredOutputError(ValueError):
+    """The model's output could not be parsed or validated, even after repair attempts."""
+
+    def __init__(self, message: str, output: str = ""):
+        super().__init__(message)
+        self.output = output
+
+def _candidates(text: str, opener: str, closer: str) -> List[str]:
+    """Substrings that may hold the JSON value: fenced blocks first, then the outermost brackets."""
+    found = [match.strip() for match in _FENCED.findall(text)]
+    start, end = text.find(opener), text.rfind(closer)
+    if start != -1 and end > start:
+        found.append(text[start:end + 1])
+    found.append(text.strip())
+    return found
+
+def _loads(candidate: str) -> Any:
+    """json.loads, falling back to common LLM slips: smart quotes, trailing commas, Python literals."""
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as first_error:
+        cleaned = _TRAILING_COMMA.sub(r"\1", candidate.translate(_SMART_QUOTES))
+        try:
+            return json.loads(cleaned)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return ast.literal_eval(cleaned)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            raise first_error
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> None:
+    """
+    Checks value against a small JSON-schema subset: "type", "required" (object keys)
+    and "items" (schema for every array element). Raises StructuredOutputError.
+    """
+    expected = schema.get("type")
+    if expected and not isinstance(value, _TYPES[expected]):
+        raise StructuredOutputError(f"{path} should be a JSON {expected}, got {type(value).__name__}")
+    if isinstance(value, dict):
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise StructuredOutputError(f"{path} is missing required keys: {', '.join(missing)}")
+    if isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{index}]")
+
+def parse_structured(text: str, schema: Dict[str, Any]) -> Any:
+    """Finds, parses and validates the JSON value in an LLM response."""
+    opener, closer = ("[", "]") if schema.get("type") == "array" else ("{", "}")
+    error: Optional[Exception] = None
+    for candidate in _candidates(text, opener, closer):
+        try:
+            value = _loads(candidate)
+        except (json.JSONDecodeError, ValueError) as e:
+            error = error or e
+            continue
+        try:
+            validate(value, schema)
+            return value
+        except StructuredOutputError as e:
+            # A value that parses but fails validation is the more useful error to report.
+            error = e
+    raise StructuredOutputError(f"{error}" if error else "no JSON value found", text)
+
+def describe_schema(schema: Dict[str, Any]) -> str:
+    """A one-line description of the schema for repair prompts."""
+    kind = schema.get("type", "value")
+    if kind == "array" and "items" in schema:
+        return f"a JSON array where each element is {describe_schema(schema['items'])}"
+    if kind == "object" and schema.get("required"):
+        return f"a JSON object with the keys {', '.join(repr(key) for key in schema['required'])}"
+    return f"a JSON {kind}"
+
+def query_structured(prompt: str, schema: Dict[str, Any], retries: int = STRUCTURED_OUTPUT_RETRIES,
+                     use_cache: bool = True, **query_kwargs) -> Any:
+    """
+    Queries the LLM and returns the parsed, validated JSON value. When the output does not
+    parse, a short repair prompt holding only the bad output and the error is sent, up to
+    retries times, before StructuredOutputError is raised. Unusable responses are evicted
+    from the response cache and repairs always go to the endpoint, so a bad sample is
+    never replayed.
+    """
+    output = query_huggingface_api(prompt, use_cache=use_cache, **query_kwargs)
+    for attempt in range(retries + 1):
+        try:
+            return parse_structured(output, schema)
+        except StructuredOutputError as e:
+            if attempt == 0 and use_cache:
+                evict_cached_response(prompt, **query_kwargs)
+            if attempt == retries:
+                raise StructuredOutputError(f"unusable output after {retries} repair attempts: {e}", output) from e
+            print(f"🔧 Structured output rejected ({e}); asking for a repair ({attempt + 1}/{retries})...")
+            increment("llm_retries")
+            repair_prompt = REPAIR_TEMPLATE.format(
+                expected=describe_schema(schema), error=e, output=output[-REPAIR_MAX_CHARS:],
+            )
+            output = query_huggingface_api(repair_prompt, use_cache=False, **query_kwargs)
@@ -0,0 +1,90 @@
+# FILE: utils/vector_store.py
+
+import os
+import pickle
+import shutil
+import threading
+from typing import Dict, List, Tuple
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_embeddings = None
+_stores: Dict[str, Tuple[tuple, object]] = {}
+_lock = threading.Lock()
+
+def get_embeddings():
+    """Returns the process-wide sentence-transformers embedding model, loading it once."""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    return _embeddings
+
+def _index_signature(path: str) -> tuple:
+    """Identifies the on-disk version of an index by file sizes and modification times."""
+    signature = []
+    for name in ("index.faiss", "index.pkl"):
+        stat = os.stat(os.path.join(path, name))
+        signature.append((name, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(signature)
+
+def _load_faiss(path: str):
+    """Loads a saved FAISS store, memory-mapping the vectors read-only where FAISS supports it."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_file = os.path.join(path, "index.faiss")
+    try:
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_file)
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(get_embeddings(), index, docstore, index_to_docstore_id)
+
+def get_vector_store(path: str):
+    """
+    Returns the FAISS store saved at path. The loaded store is kept for the life of
+    the process and only reloaded when the files on disk change.
+    """
+    if not os.path.exists(os.path.join(path, "index.faiss")):
+        raise FileNotFoundError(f"FAISS index not found at '{path}'. Please run ingest.py first.")
+    signature = _index_signature(path)
+    cached = _stores.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        cached = _stores.get(path)
+        if cached is None or cached[0] != signature:
+            print(f"📂 Loading FAISS index from '{path}'...")
+            cached = (signature, _load_faiss(path))
+            _stores[path] = cached
+    return cached[1]
+
+def search_shards(paths: List[str], query: str, k: int = 5) -> list:
+    """
+    Searches several saved FAISS stores directly and merges their hits into one top-k list.
+    The query is embedded once; every shard uses the same model and distance, so scores compare.
+    """
+    query_vector = get_embeddings().embed_query(query)
+    hits = []
+    for path in paths:
+        hits.extend(get_vector_store(path).similarity_search_with_score_by_vector(query_vector, k=k))
+    hits.sort(key=lambda hit: hit[1])
+    return [doc for doc, _ in hits[:k]]
+
+def save_vector_store(db, path: str) -> None:
+    """
+    Saves a FAISS store by writing to a sibling directory and swapping the files in,
+    so processes that have the old index memory-mapped keep a consistent view.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    db.save_local(tmp_path)
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(tmp_path):
+        os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+    os.rmdir(tmp_path)